@@ -7,8 +7,6 @@ class AbstractLanguageHelper:
     REGEX_NORM_ECLIPSE = re.compile(r"L([^;]+);.*") #todo: why is this called eclipse?
     REGEX_PROJECT = re.compile(r"\/(.*)\/src/.*")
 
-    TEXT_SELECTION_OFFSET_QUERY = "SELECT timestamp, action, target, referrer FROM logger_log WHERE action = 'Text selection offset' ORDER BY timestamp"
-
     def __init__(self, fileExtension, normalizedPathRegex, packageRegex):
         self.FileExtension = fileExtension
         self.REGEX_NORM_PATH = re.compile(normalizedPathRegex)
@@ -46,6 +44,11 @@ class AbstractLanguageHelper:
     def hasCorrectExtension(self, filePath):
         return filePath.lower().endswith(self.FileExtension)
 
+    def includeTextSelectionOffset(self, filePath):
+        # Whether a Text selection offset in the given file can be part of
+        # the navigation path
+        return True
+
     #==============================================================================#
     # Helper methods for initial weights on the graph                              #
     #==============================================================================#
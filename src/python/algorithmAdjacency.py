@@ -3,6 +3,6 @@ from pfisGraph import EdgeType
 
 class Adjacency(CodeStructure):
     
-    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0):
-        CodeStructure.__init__(self, langHelper, name, fileName, [EdgeType.ADJACENT], includeTop, numTopPredictions)
+    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0, useSnapshot=False):
+        CodeStructure.__init__(self, langHelper, name, fileName, [EdgeType.ADJACENT], includeTop, numTopPredictions, useSnapshot)
         
\ No newline at end of file
@@ -3,5 +3,5 @@ from pfisGraph import EdgeType
 
 class CallDepth(CodeStructure):
     
-    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0):
-        CodeStructure.__init__(self, langHelper, name, fileName, [EdgeType.CALLS], includeTop, numTopPredictions)
\ No newline at end of file
+    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0, useSnapshot=False):
+        CodeStructure.__init__(self, langHelper, name, fileName, [EdgeType.CALLS], includeTop, numTopPredictions, useSnapshot)
\ No newline at end of file
@@ -1,13 +1,18 @@
 from predictiveAlgorithm import PredictiveAlgorithm
 from predictions import Prediction
 from collections import deque
+from graphAttributes import EdgeType
+from ranking import Ranking
 
 class CodeStructure(PredictiveAlgorithm):
         
-    def __init__(self, langHelper, name, fileName, edgeTypes, includeTop = False, numTopPredictions=0):
+    def __init__(self, langHelper, name, fileName, edgeTypes, includeTop = False, numTopPredictions=0,
+                 useSnapshot=False):
         PredictiveAlgorithm.__init__(self, langHelper, name, fileName, includeTop, numTopPredictions)
         self.edgeTypes = edgeTypes
         self.nodeDistances = None
+        # Search pfisGraph.getSnapshot() instead of the networkx graph
+        self.useSnapshot = useSnapshot
         
     def makePrediction(self, pfisGraph, navPath, navNumber):
         if navNumber < 1 or navNumber >= navPath.getLength():
@@ -17,30 +22,26 @@ class CodeStructure(PredictiveAlgorithm):
         fromMethodFqn = navToPredict.fromFileNav.methodFqn
         methodToPredict = navToPredict.toFileNav.methodFqn
         self.nodeDistances = {}
-        sortedRanksMethodsOnly = []
+        methods = []
         
         if not navToPredict.isToUnknown() and pfisGraph.containsNode(methodToPredict):
             result = self.__breadthFirstSearch(pfisGraph, fromMethodFqn, methodToPredict) 
             if result > 0:
-                sortedRanks = sorted(self.nodeDistances, key = lambda node: self.nodeDistances[node])
-                sortedRanksMethodsOnly = self.getRanksForMethodsOnly(sortedRanks, pfisGraph)
-                
-                firstIndex = self.getFirstIndex(sortedRanksMethodsOnly, self.nodeDistances, result)
-                lastIndex = self.getLastIndex(sortedRanksMethodsOnly, self.nodeDistances, result)
-                numTies = lastIndex - firstIndex + 1
-                rankWithTies = self.getRankConsideringTies(firstIndex + 1, numTies)
+                methods = self.getRanksForMethodsOnly(self.nodeDistances, pfisGraph)
+                ranking = Ranking(methods, self.nodeDistances)
+                targetRank = ranking.getRankOfScore(result)
                 topPredictions = []
                 
                 if self.includeTop:
-                    topPredictions = self.getTopPredictions(sortedRanksMethodsOnly, self.nodeDistances)
+                    topPredictions = ranking.getTopPredictions(self.numTopPredictions)
                 
-                return Prediction(navNumber, rankWithTies, len(sortedRanksMethodsOnly), numTies,
+                return Prediction(navNumber, targetRank["rankWithTies"], len(methods), targetRank["numTies"],
                            fromMethodFqn,
                            methodToPredict,
                            navToPredict.toFileNav.timestamp,
                            topPredictions)
         
-        return Prediction(navNumber, 999999, len(sortedRanksMethodsOnly), 0,
+        return Prediction(navNumber, 999999, len(methods), 0,
                            str(navToPredict.fromFileNav),
                            str(navToPredict.toFileNav),
                            navToPredict.toFileNav.timestamp)
@@ -50,6 +51,20 @@ class CodeStructure(PredictiveAlgorithm):
             raise RuntimeError('breadthFirstSearch: Node not found in PFIS Graph: ' + fromNode)
         
         fromNodeEquivalent = pfisGraph.getFqnOfEquivalentNode(fromNode)
+        if self.useSnapshot:
+            self.__breadthFirstSearchOnSnapshot(pfisGraph, fromNodeEquivalent)
+        else:
+            self.__breadthFirstSearchOnGraph(pfisGraph, fromNodeEquivalent)
+                    
+        del self.nodeDistances[fromNodeEquivalent]
+                    
+        methodToPredictEquivalent = pfisGraph.getFqnOfEquivalentNode(methodToPredict)
+        if methodToPredictEquivalent in self.nodeDistances:
+            return self.nodeDistances[methodToPredictEquivalent]
+        
+        return -1
+
+    def __breadthFirstSearchOnGraph(self, pfisGraph, fromNodeEquivalent):
         queue = deque()
         self.nodeDistances[fromNodeEquivalent] = 0
         queue.append(fromNodeEquivalent)
@@ -62,11 +77,25 @@ class CodeStructure(PredictiveAlgorithm):
                 if neighbor not in self.nodeDistances:
                     self.nodeDistances[neighbor] = self.nodeDistances[currentNode] + 1
                     queue.append(neighbor)
-                    
-        del self.nodeDistances[fromNodeEquivalent]
-                    
-        methodToPredictEquivalent = pfisGraph.getFqnOfEquivalentNode(methodToPredict)
-        if methodToPredictEquivalent in self.nodeDistances:
-            return self.nodeDistances[methodToPredictEquivalent]
-        
-        return -1
\ No newline at end of file
+
+    def __breadthFirstSearchOnSnapshot(self, pfisGraph, fromNodeEquivalent):
+        # The same search as above on integer node ids. Nodes are added to
+        # nodeDistances in the same order, so ties sort the same way.
+        snapshot = pfisGraph.getSnapshot()
+        mask = EdgeType.getMask(self.edgeTypes)
+        distances = [-1] * snapshot.getNumberOfNodes()
+        fromNodeId = snapshot.getId(fromNodeEquivalent)
+        queue = deque()
+        distances[fromNodeId] = 0
+        self.nodeDistances[fromNodeEquivalent] = 0
+        queue.append(fromNodeId)
+
+        while len(queue) > 0:
+            currentNodeId = queue.popleft()
+            distance = distances[currentNodeId] + 1
+
+            for neighborId in snapshot.getNeighbors(currentNodeId, mask):
+                if distances[neighborId] < 0:
+                    distances[neighborId] = distance
+                    self.nodeDistances[snapshot.getFqn(neighborId)] = distance
+                    queue.append(neighborId)
@@ -3,10 +3,13 @@ from algorithmCallDepth import CallDepth
 from algorithmFrequency import Frequency
 from algorithmPFIS import PFIS
 from algorithmPFISTouchOnce import PFISTouchOnce
+from algorithmPFISSweep import PFISSweep
+from algorithmPFISLocalPush import PFISLocalPush
 from algorithmRecency import Recency
 from algorithmSourceTopology import SourceTopology
 from algorithmTFIDF import TFIDF
 from algorithmLSI import LSI
+from algorithmLexicalBase import LexicalHelper
 from algorithmWorkingSet import WorkingSet
 
 
@@ -14,6 +17,7 @@ class AlgorithmFactory:
 	def __init__(self, langHelper, dbPath):
 		self.langHelper = langHelper
 		self.tempDbPath = dbPath
+		self.lexicalHelper = None
 
 	def getAlgorithm(self, node, suffix):
 
@@ -30,6 +34,8 @@ class AlgorithmFactory:
 			elif algClass == 'Frequency' : return self.__parseFrequency(node, suffix)
 			elif algClass == 'PFIS' : return self.__parsePFIS(node, suffix)
 			elif algClass == 'PFISTouchOnce' : return self.__parsePFISTouchOnce(node, suffix)
+			elif algClass == 'PFISSweep' : return self.__parsePFISSweep(node, suffix)
+			elif algClass == 'PFISLocalPush' : return self.__parsePFISLocalPush(node, suffix)
 			elif algClass == 'Recency' : return self.__parseRecency(node, suffix)
 			elif algClass == 'SourceTopology' : return self.__parseSourceTopology(node, suffix)
 			elif algClass == 'TFIDF' : return self.__parseTFIDF(node, suffix)
@@ -51,13 +57,15 @@ class AlgorithmFactory:
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
 		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
 		return Adjacency(self.langHelper, algoName,
-			fileName, includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
+			fileName, includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			useSnapshot=self.getSnapshotAttribute(node))
 
 	def __parseCallDepth(self, node, graphTypeSuffix):
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
 		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
 		return CallDepth(self.langHelper, algoName,
-			fileName, includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
+			fileName, includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			useSnapshot=self.getSnapshotAttribute(node))
 
 	def __parseFrequency(self, node, graphTypeSuffix):
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
@@ -78,19 +86,29 @@ class AlgorithmFactory:
 		decayFactor = 0.85
 		decayHistory = 0.9
 		numSpread = 2
+		matrixMode = None
+		tolerance = None
+		rankWindow = None
+		rankTopK = 10
 
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
 		if 'history' in node.attrib and node.attrib['history'] == 'true': history = True
 		if 'decayFactor' in node.attrib: decayFactor = float(node.attrib['decayFactor'])
 		if 'decayHistory' in node.attrib: decayHistory = float(node.attrib['decayHistory'])
 		if 'numSpread' in node.attrib: numSpread = int(node.attrib['numSpread'])
+		if 'matrix' in node.attrib: matrixMode = node.attrib['matrix']
+		if 'tolerance' in node.attrib: tolerance = float(node.attrib['tolerance'])
+		if 'rankWindow' in node.attrib: rankWindow = int(node.attrib['rankWindow'])
+		if 'rankTopK' in node.attrib: rankTopK = int(node.attrib['rankTopK'])
 		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
 
 		return PFIS(self.langHelper, algoName,
 			fileName, history=history, goal=goal,
 			decayFactor=decayFactor, decayHistory=decayHistory,
 			numSpread=numSpread,
-			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
+			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			useSnapshot=self.getSnapshotAttribute(node), matrixMode=matrixMode,
+			tolerance=tolerance, rankWindow=rankWindow, rankTopK=rankTopK)
 
 	def __parsePFISTouchOnce(self, node, graphTypeSuffix):
 		# TODO: Implement goal words array, maybe as a child tag labeled 'goal'
@@ -111,6 +129,53 @@ class AlgorithmFactory:
 		return PFISTouchOnce(self.langHelper, algoName,
 			fileName, history=history, goal=goal,
 			decayFactor=decayFactor, decayHistory=decayHistory,
+			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			useSnapshot=self.getSnapshotAttribute(node))
+
+	def __parsePFISSweep(self, node, graphTypeSuffix):
+		# Returns one algorithm per combination of the decayFactor,
+		# decayHistory and numSpread grids, given as lists separated by commas
+		# or spaces
+		history = False
+		goal = []
+		decayFactors = [0.85]
+		decayHistories = [0.9]
+		numSpreads = [2]
+
+		if 'history' in node.attrib and node.attrib['history'] == 'true': history = True
+		if 'decayFactor' in node.attrib: decayFactors = [float(value) for value in self.getListAttribute(node, 'decayFactor')]
+		if 'decayHistory' in node.attrib: decayHistories = [float(value) for value in self.getListAttribute(node, 'decayHistory')]
+		if 'numSpread' in node.attrib: numSpreads = [int(value) for value in self.getListAttribute(node, 'numSpread')]
+
+		topPredictionsOptions = self.getTopPredictionsAttributes(node)
+		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
+
+		return PFISSweep(self.langHelper, algoName,
+			fileName, history=history, goal=goal,
+			decayFactors=decayFactors, decayHistories=decayHistories, numSpreads=numSpreads,
+			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1]).getAlgorithms()
+
+	def __parsePFISLocalPush(self, node, graphTypeSuffix):
+		history = False
+		goal = []
+		decayFactor = 0.85
+		decayHistory = 0.9
+		numSpread = 2
+		epsilon = 0.0001
+
+		if 'history' in node.attrib and node.attrib['history'] == 'true': history = True
+		if 'decayFactor' in node.attrib: decayFactor = float(node.attrib['decayFactor'])
+		if 'decayHistory' in node.attrib: decayHistory = float(node.attrib['decayHistory'])
+		if 'numSpread' in node.attrib: numSpread = int(node.attrib['numSpread'])
+		if 'epsilon' in node.attrib: epsilon = float(node.attrib['epsilon'])
+
+		topPredictionsOptions = self.getTopPredictionsAttributes(node)
+		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
+
+		return PFISLocalPush(self.langHelper, algoName,
+			fileName, history=history, goal=goal,
+			decayFactor=decayFactor, decayHistory=decayHistory,
+			numSpread=numSpread, epsilon=epsilon,
 			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
 
 	def __parseRecency(self, node, graphTypeSuffix):
@@ -127,7 +192,8 @@ class AlgorithmFactory:
 
 		return SourceTopology(self.langHelper, algoName,
 			fileName, includeTop=topPredictionsOptions[0],
-			numTopPredictions=topPredictionsOptions[1])
+			numTopPredictions=topPredictionsOptions[1],
+			useSnapshot=self.getSnapshotAttribute(node))
 
 	def __parseTFIDF(self, node, graphTypeSuffix):
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
@@ -135,19 +201,26 @@ class AlgorithmFactory:
 
 		return TFIDF(self.langHelper, algoName,
 			fileName, dbFilePath=self.tempDbPath,
-			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
+			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			lexicalHelper=self.getLexicalHelper())
 
 	def __parseLSI(self, node, graphTypeSuffix):
 		numTopics = 200
+		retrainNewWords = 0.1
+		retrainChangedDocuments = 20
 
 		topPredictionsOptions = self.getTopPredictionsAttributes(node)
-		if 'numTopics' in node.attrib: numTopics = float(node.attrib['numTopics'])
+		if 'numTopics' in node.attrib: numTopics = int(node.attrib['numTopics'])
+		if 'retrainNewWords' in node.attrib: retrainNewWords = float(node.attrib['retrainNewWords'])
+		if 'retrainChangedDocuments' in node.attrib: retrainChangedDocuments = int(node.attrib['retrainChangedDocuments'])
 
 		fileName, algoName = self.getSuffixedNames(node, graphTypeSuffix)
 
 		return LSI(self.langHelper, algoName,
 			fileName, dbFilePath=self.tempDbPath, numTopics=numTopics,
-			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
+			retrainNewWords=retrainNewWords, retrainChangedDocuments=retrainChangedDocuments,
+			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1],
+			lexicalHelper=self.getLexicalHelper())
 
 	def __parseWorkingSet(self, node, graphTypeSuffix):
 		workingSetSize = 10
@@ -160,6 +233,12 @@ class AlgorithmFactory:
 			fileName, workingSetSize=workingSetSize,
 			includeTop=topPredictionsOptions[0], numTopPredictions=topPredictionsOptions[1])
 
+	def getLexicalHelper(self):
+		# The lexical algorithms all share one helper and its corpora
+		if self.lexicalHelper is None:
+			self.lexicalHelper = LexicalHelper(self.tempDbPath, self.langHelper)
+		return self.lexicalHelper
+
 	def getTopPredictionsAttributes(self, node):
 		includeTop = False
 		numTopPredictions = 0
@@ -168,3 +247,11 @@ class AlgorithmFactory:
 		if includeTop and 'numTopPredictions' in node.attrib: numTopPredictions=int(node.attrib['numTopPredictions'])
 
 		return (includeTop, numTopPredictions)
+
+	def getListAttribute(self, node, name):
+		return node.attrib[name].replace(',', ' ').split()
+
+	def getSnapshotAttribute(self, node):
+		# Graph algorithms can walk an integer-indexed snapshot of the graph
+		# instead of the graph itself. The predictions are the same.
+		return 'snapshot' in node.attrib and node.attrib['snapshot'] == 'true'
@@ -1,5 +1,6 @@
 from predictiveAlgorithm import PredictiveAlgorithm
 from predictions import Prediction
+from ranking import Ranking
 
 class Frequency(PredictiveAlgorithm):
         
@@ -21,16 +22,12 @@ class Frequency(PredictiveAlgorithm):
             methodToPredictEquivalentNode = pfisGraph.getFqnOfEquivalentNode(methodToPredict)
 
             if methodToPredictEquivalentNode in self.__methodFrequencies.keys():
-                result = self.__methodFrequencies[methodToPredictEquivalentNode]
-                sortedRanks = sorted(self.__methodFrequencies, key = lambda freq: self.__methodFrequencies[freq])
-                firstIndex = self.getFirstIndex(sortedRanks, self.__methodFrequencies, result)
-                lastIndex = self.getLastIndex(sortedRanks, self.__methodFrequencies, result)
-                numTies = lastIndex - firstIndex + 1
-                rankWithTies = self.getRankConsideringTies(firstIndex + 1, numTies)
+                ranking = Ranking(self.__methodFrequencies.keys(), self.__methodFrequencies)
+                rankWithTies = ranking.getRank(methodToPredictEquivalentNode)["rankWithTies"]
                 topPredictions = []
 
                 if self.includeTop:
-                    topPredictions = self.getTopPredictions(sortedRanks, self.__methodFrequencies)
+                    topPredictions = ranking.getTopPredictions(self.numTopPredictions)
 
                 return Prediction(navNumber, rankWithTies, len(self.__methodFrequencies), 0,
                                   fromMethodFqn,
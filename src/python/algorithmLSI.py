@@ -1,12 +1,102 @@
 from algorithmLexicalBase import LexicalBase
 from gensim import models
+import numpy
 
 class LSI(LexicalBase):
-    def __init__(self, langHelper, name, fileName, dbFilePath, numTopics = 200, includeTop=False, numTopPredictions=0):
+    # Training a model is by far the most expensive part of a prediction, so
+    # a model is kept from one prediction to the next. Documents added or
+    # changed since it was trained are folded in: projected onto the topics
+    # of the model, which stay as they were. The projected corpus, with every
+    # document normalized to unit length, is kept between predictions and
+    # only the rows of those documents are projected again.
+    #
+    # Folded in documents don't change the topics, and words the model has
+    # not seen are left out of them. The model is trained again on the whole
+    # corpus once more than RETRAIN_NEW_WORDS of the corpus's words are new
+    # to it, or more than RETRAIN_CHANGED_DOCUMENTS documents have been added
+    # or changed since it was trained. With both at 0 it is trained again
+    # whenever the corpus changes.
+    def __init__(self, langHelper, name, fileName, dbFilePath, numTopics = 200,
+                 retrainNewWords = 0.1, retrainChangedDocuments = 20, includeTop=False, numTopPredictions=0,
+                 lexicalHelper=None):
         LexicalBase.__init__(self, langHelper, name, fileName, dbFilePath,
-                             includeTop=includeTop, numTopPredictions=numTopPredictions)
+                             includeTop=includeTop, numTopPredictions=numTopPredictions, lexicalHelper=lexicalHelper)
         self.numTopics = numTopics
-        
-    def getModel(self):
+        self.RETRAIN_NEW_WORDS = retrainNewWords
+        self.RETRAIN_CHANGED_DOCUMENTS = retrainChangedDocuments
+
+        self.__model = None
+        # The corpus the model was trained on, and its versions when the
+        # model was trained and when documents were last folded in
+        self.__corpus = None
+        self.__trainedVersion = None
+        self.__version = None
+        # Document -> unit length topic vector
+        self.__projections = None
+
+    def getModel(self, corpus):
         # Initialize the model using the corpus
-        return models.LsiModel(self.corpus, num_topics=self.numTopics)
\ No newline at end of file
+        return models.LsiModel(corpus.termDocumentMatrix.getMatrix().T, num_topics=self.numTopics,
+                               id2word=corpus.dictionary)
+
+    def getSimilarities(self, corpus, queryMethodFqn):
+        if self.__needsTraining(corpus):
+            self.__train(corpus)
+        elif corpus.getVersion() != self.__version:
+            self.__foldIn(corpus)
+
+        query = numpy.zeros(self.__model.num_terms)
+        for termId, count in corpus.dictionary.doc2bow(corpus.getMethodContentsForFqn(queryMethodFqn)):
+            if termId < self.__model.num_terms:
+                query[termId] = count
+        query = self.__normalize(self.__getTopics().T.dot(query))
+
+        # Similarities have the single precision of a gensim index
+        return self.__projections.dot(query).astype(numpy.float32)
+
+    def __needsTraining(self, corpus):
+        if self.__model is None or self.__corpus is not corpus:
+            return True
+        if corpus.getVersion() == self.__version:
+            return False
+
+        matrix = corpus.termDocumentMatrix
+        numNewWords = matrix.numTerms - self.__model.num_terms
+        numChangedDocuments = len(matrix.getRowsChangedSince(self.__trainedVersion))
+        return numNewWords > self.RETRAIN_NEW_WORDS * matrix.numTerms \
+            or numChangedDocuments > self.RETRAIN_CHANGED_DOCUMENTS
+
+    def __train(self, corpus):
+        matrix = corpus.termDocumentMatrix
+        self.__model = self.getModel(corpus)
+        self.__corpus = corpus
+        self.__trainedVersion = corpus.getVersion()
+        self.__version = corpus.getVersion()
+        self.__projections = self.__normalize(matrix.getMatrix().dot(self.__getTopics()))
+
+    def __foldIn(self, corpus):
+        matrix = corpus.termDocumentMatrix
+        documents = matrix.getRowsChangedSince(self.__version)
+        counts = matrix.getMatrix()[documents][:, :self.__model.num_terms]
+        projections = self.__normalize(counts.dot(self.__getTopics()))
+
+        if matrix.numDocuments > len(self.__projections):
+            grown = numpy.zeros((matrix.numDocuments, self.__projections.shape[1]))
+            grown[:len(self.__projections)] = self.__projections
+            self.__projections = grown
+        self.__projections[documents] = projections
+        self.__version = corpus.getVersion()
+
+    def __getTopics(self):
+        # Word -> topic weights, as the model uses to transform a document
+        return self.__model.projection.u[:, :self.__model.num_topics]
+
+    def __normalize(self, vectors):
+        # Scales each row (or the vector) to unit length, leaving zeros as
+        # they are. As in gensim, topic weights of at most 1e-9 are 0: they
+        # are rounding errors, for example from words that were in no
+        # document when the model was trained.
+        vectors[numpy.abs(vectors) <= 1e-9] = 0.0
+        norms = numpy.sqrt(numpy.sum(vectors ** 2, axis=-1, keepdims=True))
+        norms[norms == 0] = 1.0
+        return vectors / norms
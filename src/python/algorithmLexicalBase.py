@@ -1,22 +1,27 @@
-import sqlite3
-
 from predictiveAlgorithm import PredictiveAlgorithm
 from gensim import similarities
-from gensim.corpora.dictionary import Dictionary
 from gensim.corpora.textcorpus import TextCorpus
 from predictions import Prediction
+from ranking import Ranking
+from eventStore import EventStore
+from termDocumentMatrix import TermDocumentMatrix
 
 class LexicalBase(PredictiveAlgorithm):
-    def __init__(self, langHelper, name, fileName, dbFilePath, includeTop = False, numTopPredictions=0):
+    def __init__(self, langHelper, name, fileName, dbFilePath, includeTop = False, numTopPredictions=0,
+                 lexicalHelper=None):
         PredictiveAlgorithm.__init__(self, langHelper, name, fileName, includeTop, numTopPredictions)
-        self.lexicalHelper = LexicalHelper(dbFilePath, langHelper)
+        # Normally shared by all the lexical algorithms of a run, see
+        # AlgorithmFactory.getLexicalHelper
+        if lexicalHelper is None:
+            lexicalHelper = LexicalHelper(dbFilePath, langHelper)
+        self.lexicalHelper = lexicalHelper
         
     def makePrediction(self, pfisGraph, navPath, navNumber):
         if navNumber < 1 or navNumber >= navPath.getLength():
             raise RuntimeError('makePrediction: navNumber must be > 0 and less than the length of navPath')
         
         navToPredict = navPath.getNavigation(navNumber)
-        sortedMethods = []
+        numMethods = 0
         
         if not navToPredict.isToUnknown():
             startTimestamp = 0
@@ -31,86 +36,115 @@ class LexicalBase(PredictiveAlgorithm):
 #             if navPath.navigations[navNumber - 1].fromFileNav is not None:
 #                 startTimestamp = navPath.navigations[navNumber - 1].fromFileNav.timestamp
             
-            self.lexicalHelper.addDocumentsToCorpus(startTimestamp, endTimestamp, pfisGraph)
-            model = self.getModel()
+            corpus = self.lexicalHelper.addDocumentsToCorpus(startTimestamp, endTimestamp, pfisGraph)
             fromMethodFqnEquivalent = pfisGraph.getFqnOfEquivalentNode(fromMethodFqn)
-            sorted_sims = self.lexicalHelper.getSortedSimilarityMatrix(model, fromMethodFqnEquivalent)
-            
-            mapMethodsToScore = {}
-            
-            for i in range(0, len(sorted_sims)):
-                _, score = sorted_sims[i]
-                sortedMethods.append(self.lexicalHelper.corpus.methodFqns[i])
-                mapMethodsToScore[self.lexicalHelper.corpus.methodFqns[i]] = score
+            ranking = self.getRanking(corpus, fromMethodFqnEquivalent)
+            numMethods = ranking.getLength()
 
             methodToPredictEqivalent = pfisGraph.getFqnOfEquivalentNode(methodToPredict)
-            value = mapMethodsToScore[methodToPredictEqivalent]
-            firstIndex = self.getFirstIndex(sortedMethods, mapMethodsToScore, value)
-            lastIndex = self.getLastIndex(sortedMethods, mapMethodsToScore, value)
-            numTies = lastIndex - firstIndex + 1
-            rankWithTies =  self.getRankConsideringTies(firstIndex + 1, numTies)
-            
-            topPredictions = []
-            if self.includeTop:
-                topPredictions = self.getTopPredictions(sortedMethods, mapMethodsToScore)
+            if corpus.getMethodContentsForFqn(methodToPredictEqivalent) is not None:
+                targetRank = ranking.getRank(methodToPredictEqivalent)
                 
-            return Prediction(navNumber, rankWithTies, len(sortedMethods), numTies,
-                       str(navToPredict.fromFileNav), 
-                       str(navToPredict.toFileNav),
-                       navToPredict.toFileNav.timestamp,
-                       topPredictions)
+                topPredictions = []
+                if self.includeTop:
+                    topPredictions = ranking.getTopPredictions(self.numTopPredictions)
+                    
+                return Prediction(navNumber, targetRank["rankWithTies"], numMethods, targetRank["numTies"],
+                           str(navToPredict.fromFileNav), 
+                           str(navToPredict.toFileNav),
+                           navToPredict.toFileNav.timestamp,
+                           topPredictions)
             
-        return Prediction(navNumber, 999999, len(sortedMethods), 0,
+        return Prediction(navNumber, 999999, numMethods, 0,
                str(navToPredict.fromFileNav), 
                str(navToPredict.toFileNav),
                navToPredict.toFileNav.timestamp)
             
-    def getModel(self):
+    def getRanking(self, corpus, queryMethodFqn):
+        # Returns the Ranking of the corpus's methods by their similarity to
+        # the query method, most similar first
+        sims = self.getSimilarities(corpus, queryMethodFqn)
+        mapMethodsToScore = dict(zip(corpus.methodFqns, sims))
+        return Ranking(corpus.methodFqns, mapMethodsToScore, reverse=True)
+    
+    def getSimilarities(self, corpus, queryMethodFqn):
+        # Returns the similarity of every document in the corpus to the query
+        # method, by document index
+        return self.lexicalHelper.getSimilarities(self.getModel(corpus), corpus, queryMethodFqn)
+    
+    def getModel(self, corpus):
         return NotImplemented('getModel is not implemented.')
     
 class LexicalHelper(object):    
-    METHOD_DECLARATION_SCENT_QUERY = "SELECT action, target, referrer " \
-        "FROM logger_log WHERE action = 'Method declaration scent' " \
-        "AND timestamp >= ? AND timestamp < ? ORDER BY timestamp"
+    # The corpora of method contents of a working database. One helper is
+    # shared by all the lexical algorithms of a run, so the events are read,
+    # and method contents split into words, once rather than once per
+    # algorithm.
+    #
+    # The documents of a corpus are named after the graph node their method
+    # stands for (see getFqnOfEquivalentNode), so each graph has its own
+    # corpus. Graphs with the same stop words share the words of each method
+    # declaration. The corpus of a graph holds the events up to the last
+    # prediction on it, and each prediction only adds the events since then.
+    # Models can tell whether it changed from its version (see
+    # CorpusOfMethodContents.getVersion).
+    METHOD_DECLARATION_SCENT_ACTIONS = ('Method declaration scent',)
     
     def __init__(self, dbFilePath, langHelper):
-        self.corpus = CorpusOfMethodContents()
         self.dbFilePath = dbFilePath
         self.langHelper = langHelper
+        # Graph -> [corpus, timestamp it holds the events up to, the words
+        # of its method declarations]
+        self.__corpora = {}
+        # Stop words -> {method declaration: words}
+        self.__words = {}
     
     def addDocumentsToCorpus(self, startTimestamp, endTimestamp, pfisGraph):
-        conn = sqlite3.connect(self.dbFilePath)
-        conn.row_factory = sqlite3.Row
+        # Returns the corpus of pfisGraph, with the events up to endTimestamp
+        events = EventStore.forDatabase(self.dbFilePath)
+        
+        if pfisGraph not in self.__corpora:
+            words = self.__words.setdefault(frozenset(pfisGraph.stopWords), {})
+            self.__corpora[pfisGraph] = [CorpusOfMethodContents(), None, words]
+        state = self.__corpora[pfisGraph]
+        corpus, corpusEndTimestamp, words = state
         
-        c = conn.cursor()
-        c.execute(self.METHOD_DECLARATION_SCENT_QUERY, [startTimestamp, endTimestamp])
-        for row in c:
+        if corpusEndTimestamp is not None and endTimestamp < corpusEndTimestamp:
+            # Going back in time: events can't be taken out, so start over
+            corpus = CorpusOfMethodContents()
+            corpusEndTimestamp = None
+        
+        if corpusEndTimestamp is not None:
+            startTimestamp = max(startTimestamp, corpusEndTimestamp)
+        state[0], state[1] = corpus, endTimestamp
+        
+        for _, _, target, referrer in events.getEvents(self.METHOD_DECLARATION_SCENT_ACTIONS,
+                                                       startTimestamp, endTimestamp):
             target, referrer = \
-                    self.langHelper.fixSlashes(row['target']), \
-                    self.langHelper.fixSlashes(row['referrer'])
+                    self.langHelper.fixSlashes(target), \
+                    self.langHelper.fixSlashes(referrer)
                     
-            words = pfisGraph.getWordNodes_splitCamelAndStem(referrer)
+            if referrer not in words:
+                words[referrer] = pfisGraph.getWordNodes_splitCamelAndStem(referrer)
             targetEquivalent = pfisGraph.getFqnOfEquivalentNode(target)
-            self.corpus.addDocument(targetEquivalent, words)
-            
-        c.close()
-        conn.close()
+            corpus.addDocument(targetEquivalent, words[referrer])
+        
+        return corpus
         
-    def getSortedSimilarityMatrix(self, model, queryMethodFqn):
+    def getSimilarities(self, model, corpus, queryMethodFqn):
         
         # Build the query and covert it to the model space
-        vec_bow = self.corpus.dictionary.doc2bow(self.corpus.getMethodContentsForFqn(queryMethodFqn))
+        vec_bow = corpus.dictionary.doc2bow(corpus.getMethodContentsForFqn(queryMethodFqn))
         vec_model = model[vec_bow]
         
         # Build the index of documents we want to compare against. In this
         # case, it is the complete set of method declarations that the 
         # programmer knows about so far
-        corpus_model = model[self.corpus]
-        index = similarities.SparseMatrixSimilarity(corpus_model, num_features = len(self.corpus.dictionary))
+        corpus_model = model[corpus]
+        index = similarities.SparseMatrixSimilarity(corpus_model, num_features = len(corpus.dictionary))
         
-        # Perform the query and sort the results
-        sims = index[vec_model]
-        return sorted(enumerate(sims), key = lambda item: item[1], reverse = True)
+        # Perform the query
+        return index[vec_model]
     
 class CorpusOfMethodContents(TextCorpus):
     
@@ -118,21 +152,41 @@ class CorpusOfMethodContents(TextCorpus):
         self.mapMethodFQNtoIndex = {}
         self.methodFqns = []
         self.methodContents = []
+        # The word counts of methodContents, row by row
+        self.termDocumentMatrix = TermDocumentMatrix()
         TextCorpus.__init__(self)
         
     def addDocument(self, methodFqn, words):
         if methodFqn not in self.mapMethodFQNtoIndex:
             self.methodFqns.append(methodFqn)
-            self.mapMethodFQNtoIndex[methodFqn] = len(self.mapMethodFQNtoIndex) - 1
+            self.mapMethodFQNtoIndex[methodFqn] = len(self.methodFqns) - 1
             self.methodContents.append(words)
-            self.dictionary.doc2bow(words, allow_update = True)
+            self.termDocumentMatrix.addRow(self.dictionary.doc2bow(words, allow_update = True))
         else:
-            self.methodContents[self.mapMethodFQNtoIndex[methodFqn]] = words
-            self.dictionary = Dictionary()
-            self.dictionary.add_documents(self.get_texts())
+            index = self.mapMethodFQNtoIndex[methodFqn]
+            if self.methodContents[index] == words:
+                return
+            
+            # Replace the document's counts in the dictionary. Words no
+            # document has anymore keep their ids with a count of 0.
+            self.__removeFromDictionary(self.methodContents[index])
+            self.methodContents[index] = words
+            self.termDocumentMatrix.replaceRow(index, self.dictionary.doc2bow(words, allow_update = True))
+            self.dictionary.num_docs -= 1
+    
+    def __removeFromDictionary(self, words):
+        bow = self.dictionary.doc2bow(words)
+        for tokenId, _ in bow:
+            self.dictionary.dfs[tokenId] -= 1
+        self.dictionary.num_pos -= len(words)
+        self.dictionary.num_nnz -= len(bow)
+    
+    def getVersion(self):
+        # Changes whenever a document is added or changed
+        return self.termDocumentMatrix.version
     
     def getMethodContentsForFqn(self, fqn):
-        if fqn in self.mapMethodFQNtoIndex.keys():
+        if fqn in self.mapMethodFQNtoIndex:
             return self.methodContents[self.mapMethodFQNtoIndex[fqn]]
         return None
     
@@ -1,20 +1,98 @@
 from algorithmPFISBase import PFISBase
+from algorithmPFISBase import SnapshotActivation
+from graphAttributes import EdgeType
+import heapq
+import numpy
 
 class PFIS(PFISBase):
 
     VERBOSE = 0
     DEBUG_NODE = 'L/hexcom/Current/js_v9/main.js;.init(b)'
 
+    # Modes of the sparse matrix engine, see __spreadActivationWithMatrix
+    MATRIX_SEQUENTIAL = 'sequential'
+    MATRIX_SYNCHRONOUS = 'synchronous'
+
     def __init__(self, langHelper, name, fileName, history=False, goal = [], 
                  decayFactor = 0.85, decayHistory = 0.9, numSpread = 2,
-                 includeTop = False, numTopPredictions=0):
+                 includeTop = False, numTopPredictions=0, useSnapshot=False, matrixMode=None,
+                 tolerance=None, rankWindow=None, rankTopK=10):
         PFISBase.__init__(self, langHelper, name, fileName, history, goal, 
-                          decayFactor, decayHistory, includeTop, numTopPredictions)
+                          decayFactor, decayHistory, includeTop, numTopPredictions, useSnapshot)
         self.NUM_SPREAD = numSpread
+        if matrixMode not in (None, PFIS.MATRIX_SEQUENTIAL, PFIS.MATRIX_SYNCHRONOUS):
+            raise RuntimeError('PFIS: Unknown matrix mode: ' + str(matrixMode))
+        # Spread with the sparse matrix engine in this mode, if not None
+        self.matrixMode = matrixMode
+
+        # Early stopping, see SpreadConvergence. Off when both are None.
+        self.tolerance = tolerance
+        self.rankWindow = rankWindow
+        self.rankTopK = rankTopK
+        self.__convergence = None
+
+        # Set by the Predictor if this instance shares its spread with
+        # others, see SharedSpread
+        self.sharedSpread = None
+
+    def stopsEarly(self):
+        return self.tolerance is not None or self.rankWindow is not None
+
+    def getSharedSpreadKey(self):
+        # PFIS instances with the same key spread the same activations from
+        # the same seeds, and only differ in how many iterations they do. The
+        # dict, snapshot and sequential matrix spreads are identical, the
+        # synchronous one is not. Returns None if the instance cannot share
+        # its spread.
+        if self.stopsEarly():
+            return None
+        return (self.history, tuple(self.goal), self.DECAY_FACTOR, self.DECAY_HISTORY,
+                self.matrixMode == PFIS.MATRIX_SYNCHRONOUS)
+
+    def initialize(self, fromMethodFqn, navNumber, navPath, pfisGraph):
+        PFISBase.initialize(self, fromMethodFqn, navNumber, navPath, pfisGraph)
+
+        self.__convergence = None
+        if self.stopsEarly():
+            self.__convergence = SpreadConvergence(self.tolerance, self.rankWindow, self.rankTopK,
+                                                   pfisGraph, pfisGraph.getFqnOfEquivalentNode(fromMethodFqn))
+            self.__convergence.start(self.mapNodesToActivation.iteritems())
+
+    def __startSpread(self):
+        # Returns the list to record the nodes the spread adds in, in order, if
+        # this instance leads a SharedSpread, or None
+        if self.sharedSpread is not None and self.sharedSpread.leader is self:
+            self.sharedSpread.clear()
+            return self.sharedSpread.insertedNodes
+        return None
+
+    def __endIteration(self, iteration, getActivations):
+        # Called after every iteration of a spread with the number of
+        # iterations done and a function returning the (node, activation)
+        # pairs of the active nodes. Returns True if the spread can stop.
+        if self.sharedSpread is not None and self.sharedSpread.leader is self:
+            self.sharedSpread.addCheckpoint(iteration, getActivations)
+
+        if self.__convergence is None:
+            return False
+        self.iterations = iteration
+        return self.__convergence.isConverged(getActivations())
 
     def spreadActivation(self, pfisGraph):
+        if self.sharedSpread is not None and self.sharedSpread.restore(self):
+            return
+
+        if self.matrixMode is not None:
+            self.__spreadActivationWithMatrix(pfisGraph)
+            return
+
+        if self.useSnapshot:
+            self.__spreadActivationOnSnapshot(pfisGraph)
+            return
+
         #self.printNodes(pfisGraph)
-        for _ in range(0, self.NUM_SPREAD):
+        insertedNodes = self.__startSpread()
+        for iteration in range(1, self.NUM_SPREAD + 1):
             for node in self.mapNodesToActivation.keys():
                 if not pfisGraph.containsNode(node):
                     continue
@@ -24,6 +102,8 @@ class PFIS(PFISBase):
                 for neighbor in neighbors:
                     if neighbor not in self.mapNodesToActivation:
                         self.mapNodesToActivation[neighbor] = 0.0
+                        if insertedNodes is not None:
+                            insertedNodes.append(neighbor)
 
 
                     if PFIS.VERBOSE and neighbor == PFIS.DEBUG_NODE:
@@ -46,6 +126,154 @@ class PFIS(PFISBase):
                 #if PFIS.VERBOSE:
                     #self.printNodes(pfisGraph)
 
+            if self.__endIteration(iteration, self.mapNodesToActivation.iteritems):
+                break
+
+    def __spreadActivationOnSnapshot(self, pfisGraph):
+        # The same spreading as above, in the same order, on integer node ids
+        state = SnapshotActivation(self.mapNodesToActivation, pfisGraph, self.__startSpread())
+        snapshot, activations, nodeIds, slotsByNodeId = \
+            state.snapshot, state.activations, state.nodeIds, state.slotsByNodeId
+        mask = EdgeType.getMask(pfisGraph.getAllNeighborEdgeTypes())
+        getActivations = lambda: ((node, activations[slot]) for node, slot in self.mapNodesToActivation.iteritems())
+
+        for iteration in range(1, self.NUM_SPREAD + 1):
+            for node in self.mapNodesToActivation.keys():
+                slot = self.mapNodesToActivation[node]
+                if nodeIds[slot] is None:
+                    continue
+
+                neighbors = snapshot.getNeighbors(nodeIds[slot], mask)
+                edgeWeight = 1.0 / len(neighbors)
+                for neighborId in neighbors:
+                    neighborSlot = slotsByNodeId[neighborId]
+                    if neighborSlot < 0:
+                        neighborSlot = state.addNode(neighborId, 0.0)
+
+                    activations[neighborSlot] = activations[neighborSlot] + \
+                                                (activations[slot] * edgeWeight * self.DECAY_FACTOR)
+
+            if self.__endIteration(iteration, getActivations):
+                break
+
+        state.finish()
+
+    def __spreadActivationWithMatrix(self, pfisGraph):
+        # Spreads with the sparse TransitionMatrix of the graph snapshot over a
+        # NumPy vector of activations, in one of two modes.
+        #
+        # MATRIX_SEQUENTIAL is the equivalence mode. Like spreadActivation,
+        # each step visits the active nodes one at a time in the order of
+        # mapNodesToActivation, and a node spreads the activation it has when
+        # it is visited, including what it received earlier in the same step.
+        # Only the updates of its neighbors are vectorized, and the
+        # activations are identical to those of spreadActivation.
+        #
+        # MATRIX_SYNCHRONOUS does one sparse matrix-vector product per step,
+        # where every node spreads the activation it had at the start of the
+        # step. It is much faster for large numSpread values, but activation
+        # only travels one edge per step, so activations are lower and nodes
+        # with close activations can rank differently.
+        #
+        # Both start from the seeds set by initialize (navigation history and
+        # goal words). As in spreadActivation, seeds that are not in the graph
+        # spread nothing, and a seed standing for an equivalent node of the
+        # graph spreads its own, unchanging activation to that node's
+        # neighbors.
+        snapshot = pfisGraph.getSnapshot()
+        matrix = snapshot.getTransitionMatrix(EdgeType.getMask(pfisGraph.getAllNeighborEdgeTypes()))
+        activation = numpy.zeros(matrix.getNumberOfNodes())
+        isActive = numpy.zeros(matrix.getNumberOfNodes(), dtype=bool)
+        # Seed -> id of the node it stands for
+        equivalentSeeds = {}
+
+        for node in self.mapNodesToActivation:
+            nodeId = pfisGraph.getSnapshotNodeId(node)
+            if nodeId is None:
+                continue
+            if snapshot.getFqn(nodeId) == node:
+                activation[nodeId] = self.mapNodesToActivation[node]
+                isActive[nodeId] = True
+            else:
+                equivalentSeeds[node] = nodeId
+
+        def getActivations():
+            for node in self.mapNodesToActivation:
+                nodeId = snapshot.getId(node)
+                if node in equivalentSeeds or nodeId is None:
+                    yield node, self.mapNodesToActivation[node]
+                else:
+                    yield node, activation[nodeId]
+
+        insertedNodes = self.__startSpread()
+        if insertedNodes is None:
+            # Nothing to record the added nodes in
+            insertedNodes = []
+        if self.matrixMode == PFIS.MATRIX_SEQUENTIAL:
+            self.__spreadSequentially(snapshot, matrix, activation, isActive, equivalentSeeds,
+                                      getActivations, insertedNodes)
+        else:
+            self.__spreadSynchronously(snapshot, matrix, activation, isActive, equivalentSeeds,
+                                       getActivations, insertedNodes)
+
+        for node in self.mapNodesToActivation:
+            if node not in equivalentSeeds:
+                nodeId = snapshot.getId(node)
+                if nodeId is not None:
+                    self.mapNodesToActivation[node] = float(activation[nodeId])
+
+    def __spreadSequentially(self, snapshot, matrix, activation, isActive, equivalentSeeds,
+                             getActivations, insertedNodes):
+        for iteration in range(1, self.NUM_SPREAD + 1):
+            for node in self.mapNodesToActivation.keys():
+                if node in equivalentSeeds:
+                    nodeId = equivalentSeeds[node]
+                    nodeActivation = self.mapNodesToActivation[node]
+                else:
+                    nodeId = snapshot.getId(node)
+                    if nodeId is None:
+                        continue
+                    nodeActivation = activation[nodeId]
+
+                neighbors = matrix.getNeighbors(nodeId)
+                for neighborId in neighbors[~isActive[neighbors]]:
+                    self.mapNodesToActivation[snapshot.getFqn(neighborId)] = 0.0
+                    insertedNodes.append(snapshot.getFqn(neighborId))
+                isActive[neighbors] = True
+
+                if matrix.hasSelfLoop[nodeId] and node not in equivalentSeeds:
+                    # The node gains activation while it spreads it
+                    for neighborId in neighbors:
+                        activation[neighborId] = activation[neighborId] + \
+                                                 (activation[nodeId] * matrix.edgeWeights[nodeId] * self.DECAY_FACTOR)
+                else:
+                    activation[neighbors] += nodeActivation * matrix.edgeWeights[nodeId] * self.DECAY_FACTOR
+
+            if self.__endIteration(iteration, getActivations):
+                break
+
+    def __spreadSynchronously(self, snapshot, matrix, activation, isActive, equivalentSeeds,
+                              getActivations, insertedNodes):
+        seedActivation = numpy.zeros(matrix.getNumberOfNodes())
+        isSeed = numpy.zeros(matrix.getNumberOfNodes(), dtype=bool)
+        for node in equivalentSeeds:
+            seedActivation[equivalentSeeds[node]] += self.mapNodesToActivation[node]
+            isSeed[equivalentSeeds[node]] = True
+
+        for iteration in range(1, self.NUM_SPREAD + 1):
+            # Every neighbor of an active node becomes active, even if it
+            # receives no activation
+            wasActive = isActive.copy()
+            isActive |= matrix.spread((isActive | isSeed).astype(float)) > 0
+            activation += self.DECAY_FACTOR * matrix.spread(activation + seedActivation)
+
+            for nodeId in numpy.flatnonzero(isActive & ~wasActive):
+                self.mapNodesToActivation[snapshot.getFqn(nodeId)] = 0.0
+                insertedNodes.append(snapshot.getFqn(nodeId))
+
+            if self.__endIteration(iteration, getActivations):
+                break
+
     def printNodes(self, pfisGraph):
         nodeList = pfisGraph.graph.nodes()
         print "Nodes currently present in the graph along with their weights are:"
@@ -57,3 +285,116 @@ class PFIS(PFISBase):
                 print "(",node,")"
 
         print "Total number of nodes currently in the graph are: ", len(nodeList)
+
+
+class SharedSpread(object):
+    # PFIS instances with the same getSharedSpreadKey spread the same
+    # activations, and the ones with fewer iterations just stop sooner. So
+    # only the instance with the most iterations, the leader, spreads. The
+    # Predictor has it predict first, and it records the activations after
+    # the iteration counts of the others, which then copy them.
+    def __init__(self, algorithms):
+        self.leader = max(algorithms, key=lambda algorithm: algorithm.NUM_SPREAD)
+        self.numSpreads = set(algorithm.NUM_SPREAD for algorithm in algorithms
+                              if algorithm is not self.leader)
+        for algorithm in algorithms:
+            algorithm.sharedSpread = self
+        self.clear()
+
+    def clear(self):
+        # The nodes the leader's spread added, in the order it added them,
+        # and per recorded iteration count, how many of them it had added by
+        # then and the activations of all the nodes
+        self.insertedNodes = []
+        self.checkpoints = {}
+
+    def addCheckpoint(self, iteration, getActivations):
+        if iteration in self.numSpreads:
+            self.checkpoints[iteration] = (len(self.insertedNodes), dict(getActivations()))
+
+    def restore(self, algorithm):
+        # Gives the algorithm, already initialized with the seeds, the
+        # activations the leader had after as many iterations. The nodes are
+        # added in the order its own spread would add them, so ties are
+        # broken the same way. Returns False if there is no such checkpoint,
+        # and the algorithm has to spread itself.
+        if algorithm is self.leader:
+            return False
+        if algorithm.NUM_SPREAD == 0:
+            return True
+        if algorithm.NUM_SPREAD not in self.checkpoints:
+            return False
+
+        numInserted, activations = self.checkpoints[algorithm.NUM_SPREAD]
+        for node in self.insertedNodes[:numInserted]:
+            algorithm.mapNodesToActivation[node] = 0.0
+        for node in algorithm.mapNodesToActivation:
+            algorithm.mapNodesToActivation[node] = float(activations[node])
+        return True
+
+class SpreadConvergence(object):
+    # Decides when a PFIS spread can stop before numSpread iterations: once
+    # the L1 change of the activations in an iteration is below tolerance,
+    # or once the topK methods that would be predicted have stayed the same,
+    # in the same order, for rankWindow iterations. Either test is off when
+    # its setting is None.
+    #
+    # Spreading only adds activation, so the total keeps growing by about
+    # the decay factor every iteration. The L1 change is measured between
+    # the activations scaled to sum to 1, which settle once the ranking
+    # does.
+    def __init__(self, tolerance, rankWindow, topK, pfisGraph, excludeNode):
+        self.tolerance = tolerance
+        self.rankWindow = rankWindow
+        self.topK = topK
+        self.pfisGraph = pfisGraph
+        self.excludeNode = excludeNode
+
+        self.__previousActivations = None
+        self.__previousTotal = 0.0
+        self.__previousTop = None
+        self.__stableIterations = 0
+
+    def start(self, activations):
+        # Takes the (node, activation) pairs before the first iteration
+        self.__previousActivations = dict(activations)
+        self.__previousTotal = sum(self.__previousActivations.itervalues())
+        self.__previousTop = self.__getTop(self.__previousActivations)
+
+    def isConverged(self, activations):
+        # Takes the (node, activation) pairs after an iteration
+        activations = dict(activations)
+        total = sum(activations.itervalues())
+
+        if self.tolerance is not None and total > 0 and self.__previousTotal > 0:
+            change = 0.0
+            for node in activations:
+                change += abs(activations[node] / total
+                              - self.__previousActivations.get(node, 0.0) / self.__previousTotal)
+            if change < self.tolerance:
+                return True
+
+        if self.rankWindow is not None:
+            top = self.__getTop(activations)
+            if top == self.__previousTop:
+                self.__stableIterations += 1
+            else:
+                self.__stableIterations = 0
+            self.__previousTop = top
+            if self.__stableIterations >= self.rankWindow:
+                return True
+
+        self.__previousActivations = activations
+        self.__previousTotal = total
+        return False
+
+    def __getTop(self, activations):
+        if self.rankWindow is None:
+            return None
+        methods = [node for node in activations if self.__isPredictable(node)]
+        return heapq.nlargest(self.topK, methods, key=lambda node: activations[node])
+
+    def __isPredictable(self, node):
+        # The methods PFISBase.makePrediction ranks, see
+        # PfisGraph.getPredictableMethods
+        return not node == self.excludeNode and self.pfisGraph.isPredictableMethod(node)
@@ -1,28 +1,40 @@
 from predictiveAlgorithm import PredictiveAlgorithm
 from predictions import Prediction
 from pfisGraph import NodeType
+from ranking import Ranking
 
 class PFISBase(PredictiveAlgorithm):
 
     def __init__(self, langHelper, name, fileName, history=False, goal = [], \
                  decayFactor = 0.85, decayHistory = 0.9,
-                 includeTop = False, numTopPredictions=0):
+                 includeTop = False, numTopPredictions=0, useSnapshot=False):
         PredictiveAlgorithm.__init__(self, langHelper, name, fileName, includeTop, numTopPredictions)
         self.history = history
         self.goal = goal
         self.DECAY_FACTOR = decayFactor
         self.DECAY_HISTORY = decayHistory
         self.mapNodesToActivation = None
+        # Spread on pfisGraph.getSnapshot() instead of the networkx graph
+        self.useSnapshot = useSnapshot
+        # The number of spreading iterations of the current prediction, if
+        # the algorithm can stop spreading early
+        self.iterations = None
 
     def spreadActivation(self, pfisGraph):
         raise NotImplementedError('spreadActivation is not implemented in PFISBase')
 
+    def stopsEarly(self):
+        # Returns True if spreadActivation can stop before its configured
+        # number of iterations and counts the ones it does in self.iterations
+        return False
+
     def makePrediction(self, pfisGraph, navPath, navNumber):
         if navNumber < 1 or navNumber >= navPath.getLength():
             raise RuntimeError('makePrediction: navNumber must be > 0 and less than the length of navPath')
 
         navToPredict = navPath.getNavigation(navNumber)
-        sortedMethods = []
+        methods = []
+        self.iterations = 0 if self.stopsEarly() else None
 
         if not navToPredict.isToUnknown():
             fromMethodFqn = navToPredict.fromFileNav.methodFqn
@@ -35,26 +47,29 @@ class PFISBase(PredictiveAlgorithm):
                 print "Map was empty!!!!!!!!"
                 print self.name
 
-            sortedMethods = self.__getMethodNodesFromGraph(pfisGraph, pfisGraph.getFqnOfEquivalentNode(fromMethodFqn))
+            methods = pfisGraph.getPredictableMethods(self.mapNodesToActivation,
+                                                      pfisGraph.getFqnOfEquivalentNode(fromMethodFqn))
+            ranking = Ranking(methods, self.mapNodesToActivation, reverse=True)
             topPredictions = []
 
             if self.includeTop:
-                topPredictions = self.getTopPredictions(sortedMethods, self.mapNodesToActivation)
+                topPredictions = ranking.getTopPredictions(self.numTopPredictions)
 
             equivalentMethod = pfisGraph.getFqnOfEquivalentNode(methodToPredict)
-            if equivalentMethod in sortedMethods:
-                ranking = self.getRankForMethod(equivalentMethod, sortedMethods, self.mapNodesToActivation)
+            if ranking.contains(equivalentMethod):
+                targetRank = ranking.getRank(equivalentMethod)
 
-                return Prediction(navNumber, ranking["rankWithTies"], len(sortedMethods), ranking["numTies"],
+                return Prediction(navNumber, targetRank["rankWithTies"], len(methods), targetRank["numTies"],
                                   str(navToPredict.fromFileNav),
                                   str(navToPredict.toFileNav),
                                   navToPredict.toFileNav.timestamp,
-                                  topPredictions)
+                                  topPredictions, self.iterations)
 
-        return Prediction(navNumber, 999999, len(sortedMethods), 0,
+        return Prediction(navNumber, 999999, len(methods), 0,
                           str(navToPredict.fromFileNav),
                           str(navToPredict.toFileNav),
-                          navToPredict.toFileNav.timestamp)
+                          navToPredict.toFileNav.timestamp,
+                          iterations=self.iterations)
 
     def initialize(self, fromMethodFqn, navNumber, navPath, pfisGraph):
         # Reset the graph
@@ -97,19 +112,45 @@ class PFISBase(PredictiveAlgorithm):
                     if pfisGraph.getNode(stemmedWord)['type'] == NodeType.WORD:
                         self.mapNodesToActivation[stemmedWord] = 1.0
 
-    def __getMethodNodesFromGraph(self, pfisGraph, excludeNode):
-        activatedMethodNodes = []
-        sortedNodes = []
-
-        for node in self.mapNodesToActivation:
-            if node == excludeNode:
-                continue
-
-            if pfisGraph.containsNode(node):
-                #self.langHelper.excludeMethod(node): this can be added as a node attribute itself
-                if pfisGraph.getNode(node)['type'] == NodeType.METHOD \
-                        and not self.langHelper.excludeMethod(node):
-                    activatedMethodNodes.append(node)
 
-            sortedNodes = sorted(activatedMethodNodes, key=lambda method: self.mapNodesToActivation[method], reverse = True)
-        return sortedNodes
+class SnapshotActivation(object):
+    # The activation of a spread on a GraphSnapshot. The algorithm's
+    # mapNodesToActivation keeps deciding the order nodes are visited in,
+    # exactly as when spreading on the graph, but while spreading its values
+    # are slots into the lists below. finish() puts the activations back.
+    def __init__(self, mapNodesToActivation, pfisGraph, insertedNodes=None):
+        self.map = mapNodesToActivation
+        # If not None, the nodes added by addNode are appended to it
+        self.insertedNodes = insertedNodes
+        self.snapshot = pfisGraph.getSnapshot()
+        # Per slot: the activation and the snapshot id of the node (None if
+        # the node is not in the graph)
+        self.activations = []
+        self.nodeIds = []
+        # Per snapshot id: the slot of that node, or -1 if it is not active
+        self.slotsByNodeId = [-1] * self.snapshot.getNumberOfNodes()
+
+        for node in self.map:
+            nodeId = pfisGraph.getSnapshotNodeId(node)
+            slot = len(self.activations)
+            self.activations.append(self.map[node])
+            self.nodeIds.append(nodeId)
+            if nodeId is not None and self.snapshot.getFqn(nodeId) == node:
+                self.slotsByNodeId[nodeId] = slot
+            self.map[node] = slot
+
+    def addNode(self, nodeId, activation):
+        # Activates a node of the snapshot that was not active yet and
+        # returns its slot
+        slot = len(self.activations)
+        self.activations.append(activation)
+        self.nodeIds.append(nodeId)
+        self.slotsByNodeId[nodeId] = slot
+        self.map[self.snapshot.getFqn(nodeId)] = slot
+        if self.insertedNodes is not None:
+            self.insertedNodes.append(self.snapshot.getFqn(nodeId))
+        return slot
+
+    def finish(self):
+        for node in self.map:
+            self.map[node] = self.activations[self.map[node]]
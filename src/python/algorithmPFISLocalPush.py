@@ -0,0 +1,64 @@
+from algorithmPFISBase import PFISBase
+
+class PFISLocalPush(PFISBase):
+    # Approximates PFIS activation with residual pushes, as in approximate
+    # personalized PageRank, so that the work of a prediction is bounded by
+    # a threshold instead of the size of the graph the spread reaches.
+    #
+    # Spreading numSpread times, every node keeping its activation and
+    # adding DECAY_FACTOR / degree of each neighbor's, gives a node the sum
+    # over all walks of length k <= numSpread from the seeds to it of the
+    # seed's activation times DECAY_FACTOR / degree at every step, times the
+    # binomial coefficient C(numSpread, k). (This is PFIS with
+    # matrix="synchronous"; the default PFIS spread is a close variant.)
+    #
+    # Here the activation that has walked k steps is a residual on the node
+    # it reached. The residuals of one length are pushed to the next by
+    # passing DECAY_FACTOR times a node's residual on, split evenly between
+    # its neighbors. A node is only pushed while its residual is at least
+    # EPSILON * (the total seed activation) per neighbor; smaller residuals
+    # are dropped. The residuals of a length k shrink by DECAY_FACTOR, so the
+    # total work is at most 1 / (EPSILON * (1 - DECAY_FACTOR)) neighbor
+    # updates whatever numSpread is, and with EPSILON = 0 the activations
+    # are those of the full spread.
+    #
+    # Seeds that are not in the graph spread nothing. Seeds standing for an
+    # equivalent node push once through that node's neighbors.
+
+    def __init__(self, langHelper, name, fileName, history=False, goal = [],
+                 decayFactor = 0.85, decayHistory = 0.9, numSpread = 2, epsilon = 0.0001,
+                 includeTop = False, numTopPredictions=0):
+        PFISBase.__init__(self, langHelper, name, fileName, history, goal,
+                          decayFactor, decayHistory, includeTop, numTopPredictions)
+        self.NUM_SPREAD = numSpread
+        self.EPSILON = epsilon
+
+    def spreadActivation(self, pfisGraph):
+        threshold = self.EPSILON * sum(self.mapNodesToActivation.itervalues())
+        residuals = {}
+        for node in self.mapNodesToActivation:
+            if pfisGraph.containsNode(node):
+                residuals[node] = self.mapNodesToActivation[node]
+
+        # C(numSpread, k)
+        coefficient = 1.0
+        for k in range(1, self.NUM_SPREAD + 1):
+            nextResiduals = {}
+            for node in residuals:
+                neighbors = pfisGraph.getAllNeighbors(node)
+                if len(neighbors) == 0 or residuals[node] < threshold * len(neighbors):
+                    continue
+
+                share = residuals[node] * self.DECAY_FACTOR / len(neighbors)
+                for neighbor in neighbors:
+                    if neighbor not in self.mapNodesToActivation:
+                        self.mapNodesToActivation[neighbor] = 0.0
+                    nextResiduals[neighbor] = nextResiduals.get(neighbor, 0.0) + share
+
+            if len(nextResiduals) == 0:
+                break
+
+            coefficient = coefficient * (self.NUM_SPREAD - k + 1) / k
+            for node in nextResiduals:
+                self.mapNodesToActivation[node] += coefficient * nextResiduals[node]
+            residuals = nextResiduals
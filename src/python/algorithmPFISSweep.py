@@ -0,0 +1,165 @@
+from algorithmPFISBase import PFISBase
+from graphAttributes import EdgeType
+import numpy
+
+class PFISSweep(object):
+    # Runs PFIS for every combination of a grid of decay factors, history
+    # decays and numbers of spreads at the cost of about one run. Each
+    # combination is a PFISSweepColumn algorithm with its own results file.
+    #
+    # The activations of all the (decay factor, history decay) combinations
+    # are the columns of one matrix, and every iteration spreads all of them
+    # with one sparse matrix-matrix product. The numbers of spreads are
+    # checkpoints of that one spread. The spreading is that of PFIS with
+    # matrix="synchronous", and every column predicts the same as that PFIS
+    # configuration would.
+
+    def __init__(self, langHelper, name, fileName, history=False, goal=[],
+                 decayFactors=[0.85], decayHistories=[0.9], numSpreads=[2],
+                 includeTop=False, numTopPredictions=0):
+        self.history = history
+        self.goal = goal
+        self.numSpreads = sorted(set(numSpreads))
+
+        # A value given twice would give two columns with the same name and
+        # results file, so only its first occurrence is kept
+        decayFactors = self.__unique(decayFactors)
+        decayHistories = self.__unique(decayHistories)
+
+        # One column per (decay factor, history decay)
+        self.decayFactors = []
+        self.decayHistories = []
+        for decayFactor in decayFactors:
+            for decayHistory in decayHistories:
+                self.decayFactors.append(decayFactor)
+                self.decayHistories.append(decayHistory)
+
+        # Sets the seeds of the columns with each history decay
+        self.__seeders = {}
+        for decayHistory in decayHistories:
+            self.__seeders[decayHistory] = PFISBase(langHelper, name, fileName, history, goal,
+                                                    decayHistory=decayHistory)
+
+        extensionIndex = fileName.find('.txt')
+        self.algorithms = []
+        for column in range(len(self.decayFactors)):
+            for numSpread in self.numSpreads:
+                label = 'decayFactor=' + str(self.decayFactors[column]) \
+                    + ', decayHistory=' + str(self.decayHistories[column]) \
+                    + ', numSpread=' + str(numSpread)
+                columnFileName = fileName[0:extensionIndex] + '__df' + str(self.decayFactors[column]) \
+                    + '_dh' + str(self.decayHistories[column]) + '_s' + str(numSpread) + '.txt'
+                self.algorithms.append(PFISSweepColumn(langHelper, name + ' (' + label + ')', columnFileName,
+                                                       self, column, numSpread, history, goal,
+                                                       self.decayFactors[column], self.decayHistories[column],
+                                                       includeTop, numTopPredictions))
+
+        # What the checkpoints were computed for, see __spread
+        self.__key = None
+        # The nodes the spread added, in the order it added them
+        self.__insertedNodes = []
+        # numSpread -> (how many nodes had been added by then, activation
+        # matrix)
+        self.__checkpoints = {}
+        # Seed -> id of the node it stands for, for seeds that stand for an
+        # equivalent node of the graph
+        self.__equivalentSeeds = {}
+        self.__snapshot = None
+
+    def getAlgorithms(self):
+        return self.algorithms
+
+    def __unique(self, values):
+        # Returns the values without repeats, in the order given
+        uniqueValues = []
+        for value in values:
+            if value not in uniqueValues:
+                uniqueValues.append(value)
+        return uniqueValues
+
+    def restore(self, algorithm, pfisGraph, fromMethodFqn, navNumber, navPath):
+        # Gives a column algorithm, already initialized with its seeds, its
+        # activations after its number of spreads. The sweep is spread the
+        # first time a column of a prediction asks for it.
+        key = (id(pfisGraph), pfisGraph.version, id(navPath), navNumber, fromMethodFqn)
+        if key != self.__key:
+            self.__spread(pfisGraph, fromMethodFqn, navNumber, navPath)
+            self.__key = key
+
+        numInserted, activation = self.__checkpoints[algorithm.NUM_SPREAD]
+        for node in self.__insertedNodes[:numInserted]:
+            algorithm.mapNodesToActivation[node] = 0.0
+
+        for node in algorithm.mapNodesToActivation:
+            if node not in self.__equivalentSeeds:
+                nodeId = self.__snapshot.getId(node)
+                if nodeId is not None:
+                    algorithm.mapNodesToActivation[node] = float(activation[nodeId, algorithm.column])
+
+    def __spread(self, pfisGraph, fromMethodFqn, navNumber, navPath):
+        snapshot = pfisGraph.getSnapshot()
+        matrix = snapshot.getTransitionMatrix(EdgeType.getMask(pfisGraph.getAllNeighborEdgeTypes()))
+        numNodes = matrix.getNumberOfNodes()
+        numColumns = len(self.decayFactors)
+
+        activation = numpy.zeros((numNodes, numColumns))
+        seedActivation = numpy.zeros((numNodes, numColumns))
+        isActive = numpy.zeros(numNodes, dtype=bool)
+        isSeed = numpy.zeros(numNodes, dtype=bool)
+        self.__equivalentSeeds = {}
+
+        # The seeds are the same nodes for every history decay, only their
+        # activations differ
+        for decayHistory in self.__seeders:
+            self.__seeders[decayHistory].initialize(fromMethodFqn, navNumber, navPath, pfisGraph)
+
+        for column in range(numColumns):
+            seeds = self.__seeders[self.decayHistories[column]].mapNodesToActivation
+            for node in seeds:
+                nodeId = pfisGraph.getSnapshotNodeId(node)
+                if nodeId is None:
+                    continue
+                if snapshot.getFqn(nodeId) == node:
+                    activation[nodeId, column] = seeds[node]
+                    isActive[nodeId] = True
+                else:
+                    seedActivation[nodeId, column] += seeds[node]
+                    isSeed[nodeId] = True
+                    self.__equivalentSeeds[node] = nodeId
+
+        decayFactors = numpy.array(self.decayFactors)
+        self.__snapshot = snapshot
+        self.__insertedNodes = []
+        self.__checkpoints = {0: (0, activation.copy())}
+
+        for iteration in range(1, self.numSpreads[-1] + 1):
+            wasActive = isActive.copy()
+            isActive |= matrix.spread((isActive | isSeed).astype(float)) > 0
+            activation += matrix.spread(activation + seedActivation) * decayFactors
+
+            for nodeId in numpy.flatnonzero(isActive & ~wasActive):
+                self.__insertedNodes.append(snapshot.getFqn(nodeId))
+
+            if iteration in self.numSpreads:
+                self.__checkpoints[iteration] = (len(self.__insertedNodes), activation.copy())
+
+
+class PFISSweepColumn(PFISBase):
+    # One combination of a PFISSweep
+
+    def __init__(self, langHelper, name, fileName, sweep, column, numSpread, history=False, goal=[],
+                 decayFactor=0.85, decayHistory=0.9, includeTop=False, numTopPredictions=0):
+        PFISBase.__init__(self, langHelper, name, fileName, history, goal,
+                          decayFactor, decayHistory, includeTop, numTopPredictions)
+        self.sweep = sweep
+        self.column = column
+        self.NUM_SPREAD = numSpread
+        self.__prediction = None
+
+    def initialize(self, fromMethodFqn, navNumber, navPath, pfisGraph):
+        PFISBase.initialize(self, fromMethodFqn, navNumber, navPath, pfisGraph)
+        self.__prediction = (fromMethodFqn, navNumber, navPath)
+
+    def spreadActivation(self, pfisGraph):
+        fromMethodFqn, navNumber, navPath = self.__prediction
+        self.sweep.restore(self, pfisGraph, fromMethodFqn, navNumber, navPath)
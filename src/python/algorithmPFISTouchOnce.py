@@ -1,12 +1,15 @@
 from algorithmPFISBase import PFISBase
+from algorithmPFISBase import SnapshotActivation
+from graphAttributes import EdgeType
 from collections import deque
 
 class PFISTouchOnce(PFISBase):
         
     def __init__(self, langHelper, name, fileName, history=False, goal = [], \
-                 decayFactor = 0.85, decayHistory = 0.9, includeTop = False, numTopPredictions=0):
+                 decayFactor = 0.85, decayHistory = 0.9, includeTop = False, numTopPredictions=0,
+                 useSnapshot=False):
         PFISBase.__init__(self, langHelper, name, fileName, history, goal, 
-                          decayFactor, decayHistory, includeTop, numTopPredictions)
+                          decayFactor, decayHistory, includeTop, numTopPredictions, useSnapshot)
         self.history = history
         self.goal = goal
         self.DECAY_FACTOR = decayFactor
@@ -14,6 +17,10 @@ class PFISTouchOnce(PFISBase):
         self.mapNodesToActivation = None
                      
     def spreadActivation(self, pfisGraph):
+        if self.useSnapshot:
+            self.__spreadActivationOnSnapshot(pfisGraph)
+            return
+
         queue = deque()
         
         for node in self.mapNodesToActivation:
@@ -29,3 +36,29 @@ class PFISTouchOnce(PFISBase):
                 if neighbor not in self.mapNodesToActivation:
                     self.mapNodesToActivation[neighbor] = (self.mapNodesToActivation[node] * edgeWeight * self.DECAY_FACTOR)
                     queue.append(neighbor)
+
+    def __spreadActivationOnSnapshot(self, pfisGraph):
+        # The same spreading as above, in the same order, on integer node ids.
+        # Like above, every new node gets its activation from the last node
+        # of the initial map.
+        state = SnapshotActivation(self.mapNodesToActivation, pfisGraph)
+        mask = EdgeType.getMask(pfisGraph.getAllNeighborEdgeTypes())
+        queue = deque()
+
+        for node in self.mapNodesToActivation:
+            if state.nodeIds[self.mapNodesToActivation[node]] is None:
+                raise KeyError(node)
+            queue.append(state.nodeIds[self.mapNodesToActivation[node]])
+        
+        while len(queue) > 0:
+            currentNodeId = queue.popleft()
+            neighbors = state.snapshot.getNeighbors(currentNodeId, mask)
+            edgeWeight = 1.0 / len(neighbors)
+            
+            for neighborId in neighbors:
+                if state.slotsByNodeId[neighborId] < 0:
+                    activation = state.activations[self.mapNodesToActivation[node]] * edgeWeight * self.DECAY_FACTOR
+                    state.addNode(neighborId, activation)
+                    queue.append(neighborId)
+
+        state.finish()
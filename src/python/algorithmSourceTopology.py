@@ -3,7 +3,7 @@ from pfisGraph import EdgeType
 
 class SourceTopology(CodeStructure):
     
-    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0):
+    def __init__(self, langHelper, name, fileName, includeTop = False, numTopPredictions=0, useSnapshot=False):
         CodeStructure.__init__(self, langHelper, name, fileName,
                                [EdgeType.CONTAINS, EdgeType.IMPORTS, EdgeType.EXTENDS, EdgeType.IMPLEMENTS, EdgeType.CALLS, EdgeType.ADJACENT],
-                               includeTop, numTopPredictions=numTopPredictions)
\ No newline at end of file
+                               includeTop, numTopPredictions=numTopPredictions, useSnapshot=useSnapshot)
\ No newline at end of file
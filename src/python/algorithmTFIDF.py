@@ -1,12 +1,22 @@
 from algorithmLexicalBase import LexicalBase
-from gensim import models
+from invertedIndex import InvertedIndex
 
 class TFIDF(LexicalBase):
-    def __init__(self, langHelper, name, fileName, dbFilePath, includeTop = False, numTopPredictions=0):
+    # Weighs words as gensim's TfidfModel does by default: a word's count in
+    # a document times log2(number of documents / its document frequency),
+    # with every document normalized to unit length. Rather than building a
+    # model and a similarity index for every prediction, the corpus is
+    # searched through an InvertedIndex. It is only built again when the
+    # corpus changes, and only scores the documents that share words with
+    # the query.
+    def __init__(self, langHelper, name, fileName, dbFilePath, includeTop = False, numTopPredictions=0,
+                 lexicalHelper=None):
         LexicalBase.__init__(self, langHelper, name, fileName, dbFilePath,
-                             includeTop, numTopPredictions=numTopPredictions)
-            
-    def getModel(self):
-        # Initialize the model using the corpus
-        return models.TfidfModel(self.lexicalHelper.corpus)
-        
\ No newline at end of file
+                             includeTop, numTopPredictions=numTopPredictions, lexicalHelper=lexicalHelper)
+        self.__index = None
+
+    def getRanking(self, corpus, queryMethodFqn):
+        if self.__index is None or self.__index.corpus is not corpus \
+                or self.__index.version != corpus.getVersion():
+            self.__index = InvertedIndex(corpus)
+        return self.__index.search(queryMethodFqn)
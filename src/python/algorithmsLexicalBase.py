@@ -5,6 +5,7 @@ from gensim import similarities
 from gensim.corpora.dictionary import Dictionary
 from gensim.corpora.textcorpus import TextCorpus
 from predictions import Prediction
+from ranking import Ranking
 
 class LexicalBase(PredictiveAlgorithm):
     
@@ -48,17 +49,14 @@ class LexicalBase(PredictiveAlgorithm):
                 sortedMethods.append(self.corpus.methodFqns[i])
                 mapMethodsToScore[self.corpus.methodFqns[i]] = score
                 
-            value = mapMethodsToScore[methodToPredict]
-            firstIndex = self.getFirstIndex(sortedMethods, mapMethodsToScore, value)
-            lastIndex = self.getLastIndex(sortedMethods, mapMethodsToScore, value)
-            numTies = lastIndex - firstIndex + 1
-            rankWithTies =  self.getRankConsideringTies(firstIndex + 1, numTies)
+            ranking = Ranking(sortedMethods, mapMethodsToScore, reverse=True)
+            targetRank = ranking.getRank(methodToPredict)
             
             topPredictions = []
             if self.includeTop:
-                topPredictions = self.getTopPredictions(sortedMethods, mapMethodsToScore)
+                topPredictions = ranking.getTopPredictions(self.numTopPredictions)
                 
-            return Prediction(navNumber, rankWithTies, len(sortedMethods), numTies,
+            return Prediction(navNumber, targetRank["rankWithTies"], len(sortedMethods), targetRank["numTies"],
                        str(navToPredict.fromFileNav), 
                        str(navToPredict.toFileNav),
                        navToPredict.toFileNav.timestamp,
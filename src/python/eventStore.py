@@ -0,0 +1,359 @@
+import bisect
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+from workingDatabase import WorkingDatabase
+
+class EventStore(object):
+    # An in-memory copy of the logger_log events that the navigation paths,
+    # the graphs and the lexical models read. The events are loaded once and
+    # kept as one set of columns per action: timestamps as sorted integer
+    # milliseconds, the row ids, and the target and referrer as indexes into a
+    # shared table of strings. A window of events is then found by bisecting
+    # the timestamps instead of querying.
+    #
+    # A window (startTimestamp, endTimestamp] includes the events at its end
+    # time and excludes the events at its start time. This is how the text
+    # comparisons against navigation timestamps behaved in the old queries.
+    #
+    # A store can be saved to a compiled event file and memory-mapped back in
+    # later runs, which skips copying, post-processing and loading the
+    # database. See save() and fromCompiledFile().
+
+    ACTIONS = ('Package', 'Imports', 'Extends', 'Implements',
+               'Method declaration', 'Constructor invocation', 'Method invocation',
+               'Variable declaration', 'Variable type',
+               'Constructor invocation scent', 'Method declaration scent', 'Method invocation scent',
+               'Method declaration offset', 'Method declaration length',
+               'Text selection offset')
+
+    LOAD_QUERY = "SELECT rowid AS rowid, timestamp_ms, action, target, referrer FROM logger_log " \
+                 "WHERE action IN (" + ", ".join("'" + action + "'" for action in ACTIONS) + ")"
+
+    COMPILED_FILE_MAGIC = 'PFIGEVTS'
+    COMPILED_FILE_VERSION = 2
+
+    __stores = {}
+
+    @staticmethod
+    def forDatabase(dbFilePath):
+        # Every path, graph and model reading the same working database shares
+        # one store, so that the log is loaded only once per run.
+        if dbFilePath not in EventStore.__stores:
+            EventStore.__stores[dbFilePath] = EventStore.fromDatabase(dbFilePath)
+        return EventStore.__stores[dbFilePath]
+
+    @staticmethod
+    def register(dbFilePath, store):
+        # Use the given store for the working database, for example one that
+        # was read from a compiled event file.
+        EventStore.__stores[dbFilePath] = store
+
+    @staticmethod
+    def fromDatabase(dbFilePath):
+        store = EventStore()
+        store.__loadFromDatabase(dbFilePath)
+        return store
+
+    @staticmethod
+    def fromCompiledFile(filePath):
+        store = EventStore()
+        store.__loadFromCompiledFile(filePath)
+        return store
+
+    @staticmethod
+    def isCompiledFileCurrent(filePath, dbFilePath, langHelper):
+        # A compiled event file can be reused if it was written after the last
+        # change to the original database, by this version of the format and
+        # for the same language (post-processing is language specific).
+        if not os.path.exists(filePath) or os.path.getmtime(filePath) < os.path.getmtime(dbFilePath):
+            return False
+
+        f = open(filePath, 'rb')
+        try:
+            header = EventStore.__readCompiledFileHeader(f.read(len(EventStore.COMPILED_FILE_MAGIC) + 4), f)
+        finally:
+            f.close()
+
+        return header is not None \
+            and header['version'] == EventStore.COMPILED_FILE_VERSION \
+            and header['language'] == langHelper.__class__.__name__
+
+    def __init__(self):
+        self.__actionCodes = {}
+        self.__strings = []
+        self.__stringIds = {}
+        self.__lastRowid = 0
+        self.__mappedFile = None
+
+        # One entry per action code. Timestamps are doubles because array has
+        # no 64 bit integer type on every platform; they hold exact integers.
+        self.__timestamps = []
+        self.__rowids = []
+        self.__targets = []
+        self.__referrers = []
+
+        for action in EventStore.ACTIONS:
+            self.__actionCodes[action] = len(self.__timestamps)
+            self.__timestamps.append(array('d'))
+            self.__rowids.append(array('i'))
+            self.__targets.append(array('i'))
+            self.__referrers.append(array('i'))
+
+    def __loadFromDatabase(self, dbFilePath):
+        print "Loading events into memory..."
+        conn = WorkingDatabase.connect(dbFilePath)
+        conn.row_factory = sqlite3.Row
+
+        rows = []
+        for row in conn.execute(EventStore.LOAD_QUERY):
+            rows.append((row['timestamp_ms'], row['rowid'],
+                         self.__actionCodes[row['action']],
+                         self.__intern(row['target']), self.__intern(row['referrer'])))
+        conn.close()
+
+        rows.sort()
+        for timestamp, rowid, code, target, referrer in rows:
+            self.__timestamps[code].append(timestamp)
+            self.__rowids[code].append(rowid)
+            self.__targets[code].append(target)
+            self.__referrers[code].append(referrer)
+            self.__lastRowid = max(self.__lastRowid, rowid)
+
+        print "Done. Loaded " + str(len(rows)) + " events."
+
+    def __intern(self, s):
+        # None is kept out of the string table and stored as -1
+        if s is None:
+            return -1
+        if s not in self.__stringIds:
+            self.__stringIds[s] = len(self.__strings)
+            self.__strings.append(s)
+        return self.__stringIds[s]
+
+    def __string(self, stringId):
+        if stringId < 0:
+            return None
+        return self.__strings[stringId]
+
+    def addEvent(self, timestamp, action, target, referrer):
+        # Adds an event that was not in the log, such as a PFIG header. The
+        # new event gets the highest row id, so it goes after any event with
+        # the same timestamp, as a row inserted into the database would.
+        code = self.__actionCodes[action]
+        if isinstance(self.__timestamps[code], MappedColumn):
+            self.__timestamps[code] = self.__timestamps[code].toArray()
+            self.__rowids[code] = self.__rowids[code].toArray()
+            self.__targets[code] = self.__targets[code].toArray()
+            self.__referrers[code] = self.__referrers[code].toArray()
+
+        self.__lastRowid += 1
+        i = bisect.bisect_right(self.__timestamps[code], timestamp)
+        self.__timestamps[code].insert(i, timestamp)
+        self.__rowids[code].insert(i, self.__lastRowid)
+        self.__targets[code].insert(i, self.__intern(target))
+        self.__referrers[code].insert(i, self.__intern(referrer))
+
+    def hasEvent(self, timestamp, action, target, referrer):
+        # True if the store already has this exact event
+        code = self.__actionCodes[action]
+        timestamps = self.__timestamps[code]
+        for i in range(bisect.bisect_left(timestamps, timestamp), bisect.bisect_right(timestamps, timestamp)):
+            if self.__string(self.__targets[code][i]) == target \
+                    and self.__string(self.__referrers[code][i]) == referrer:
+                return True
+        return False
+
+    def getEvents(self, actions, startTimestamp, endTimestamp=None, orderByRowid=False):
+        # Returns (timestamp, action, target, referrer) tuples for the events
+        # of the given actions in (startTimestamp, endTimestamp], or after
+        # startTimestamp if there is no endTimestamp. They are ordered by
+        # timestamp, or by the order they were logged in if orderByRowid is
+        # set.
+        events = []
+        for action in actions:
+            code = self.__actionCodes[action]
+            timestamps = self.__timestamps[code]
+            start = bisect.bisect_right(timestamps, startTimestamp)
+            end = len(timestamps)
+            if endTimestamp is not None:
+                end = bisect.bisect_right(timestamps, endTimestamp)
+            if start >= end:
+                continue
+
+            timestamps = timestamps[start:end]
+            rowids = self.__rowids[code][start:end]
+            targets = self.__targets[code][start:end]
+            referrers = self.__referrers[code][start:end]
+            for i in range(len(timestamps)):
+                events.append((rowids[i], int(timestamps[i]), action,
+                               self.__string(targets[i]), self.__string(referrers[i])))
+
+        if orderByRowid:
+            events.sort()
+        else:
+            events.sort(key=lambda event: (event[1], event[0]))
+
+        return [event[1:] for event in events]
+
+    #==========================================================================#
+    # Compiled event files                                                     #
+    #==========================================================================#
+    # Layout, all little-endian:
+    #   magic, header length (uint32), header (JSON)
+    #   per action in header order: timestamps (double), row ids, targets and
+    #       referrers (int32), one entry per event
+    #   string table: offsets (uint32, one more than the number of strings),
+    #       then the UTF-8 bytes of all strings
+
+    def save(self, filePath, langHelper):
+        print "Writing compiled events to " + filePath + "..."
+        header = {
+            'version': EventStore.COMPILED_FILE_VERSION,
+            'language': langHelper.__class__.__name__,
+            'lastRowid': self.__lastRowid,
+            'actions': [[action, len(self.__timestamps[self.__actionCodes[action]])] for action in EventStore.ACTIONS],
+            'strings': len(self.__strings)
+        }
+        headerBytes = json.dumps(header)
+
+        f = open(filePath + '.tmp', 'wb')
+        f.write(EventStore.COMPILED_FILE_MAGIC)
+        f.write(struct.pack('<I', len(headerBytes)))
+        f.write(headerBytes)
+
+        for action in EventStore.ACTIONS:
+            code = self.__actionCodes[action]
+            for column, typecode in ((self.__timestamps[code], 'd'), (self.__rowids[code], 'i'),
+                                     (self.__targets[code], 'i'), (self.__referrers[code], 'i')):
+                EventStore.__writeArray(f, array(typecode, column))
+
+        offsets = array('I', [0])
+        encodedStrings = []
+        for i in range(len(self.__strings)):
+            s = self.__strings[i]
+            if not isinstance(s, unicode):
+                s = str(s).decode('utf-8', 'replace')
+            encoded = s.encode('utf-8')
+            encodedStrings.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+        EventStore.__writeArray(f, offsets)
+        for encoded in encodedStrings:
+            f.write(encoded)
+        f.close()
+
+        # Replace the old file only once the new one is complete
+        if os.path.exists(filePath):
+            os.remove(filePath)
+        os.rename(filePath + '.tmp', filePath)
+        print "Done."
+
+    @staticmethod
+    def __writeArray(f, values):
+        if sys.byteorder != 'little':
+            values = array(values.typecode, values)
+            values.byteswap()
+        values.tofile(f)
+
+    @staticmethod
+    def __readCompiledFileHeader(prefix, f):
+        magicLength = len(EventStore.COMPILED_FILE_MAGIC)
+        if len(prefix) < magicLength + 4 or prefix[0:magicLength] != EventStore.COMPILED_FILE_MAGIC:
+            return None
+        headerLength = struct.unpack('<I', prefix[magicLength:magicLength + 4])[0]
+        return json.loads(f.read(headerLength))
+
+    def __loadFromCompiledFile(self, filePath):
+        print "Mapping compiled events from " + filePath + "..."
+        f = open(filePath, 'rb')
+        self.__mappedFile = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+
+        mm = self.__mappedFile
+        magicLength = len(EventStore.COMPILED_FILE_MAGIC)
+        headerLength = struct.unpack_from('<I', mm, magicLength)[0]
+        position = magicLength + 4
+        header = json.loads(mm[position:position + headerLength])
+        position += headerLength
+
+        for action, count in header['actions']:
+            code = self.__actionCodes[action]
+            self.__timestamps[code] = MappedColumn(mm, position, count, 'd')
+            position += 8 * count
+            self.__rowids[code] = MappedColumn(mm, position, count, 'i')
+            position += 4 * count
+            self.__targets[code] = MappedColumn(mm, position, count, 'i')
+            position += 4 * count
+            self.__referrers[code] = MappedColumn(mm, position, count, 'i')
+            position += 4 * count
+
+        offsets = MappedColumn(mm, position, header['strings'] + 1, 'I')
+        position += 4 * (header['strings'] + 1)
+        self.__strings = MappedStrings(mm, position, offsets)
+        self.__lastRowid = header['lastRowid']
+        print "Done."
+
+
+class MappedColumn(object):
+    # A read-only column of numbers in a memory-mapped compiled event file.
+    # Supports what bisect and EventStore need: len, indexing and slicing.
+    def __init__(self, mm, offset, count, typecode):
+        self.mm = mm
+        self.offset = offset
+        self.count = count
+        self.typecode = typecode
+        self.itemFormat = '<' + typecode
+        self.itemSize = struct.calcsize(self.itemFormat)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, _ = i.indices(self.count)
+            values = array(self.typecode)
+            if stop > start:
+                values.fromstring(self.mm[self.offset + start * self.itemSize:self.offset + stop * self.itemSize])
+                if sys.byteorder != 'little':
+                    values.byteswap()
+            return values
+
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError('MappedColumn index out of range')
+        return struct.unpack_from(self.itemFormat, self.mm, self.offset + i * self.itemSize)[0]
+
+    def toArray(self):
+        return self[0:self.count]
+
+
+class MappedStrings(object):
+    # The string table of a compiled event file. Strings are decoded when
+    # they are first read. Strings added afterwards are kept in memory.
+    def __init__(self, mm, offset, offsets):
+        self.mm = mm
+        self.offset = offset
+        self.offsets = offsets
+        self.count = len(offsets) - 1
+        self.decoded = {}
+        self.added = []
+
+    def __len__(self):
+        return self.count + len(self.added)
+
+    def __getitem__(self, i):
+        if i >= self.count:
+            return self.added[i - self.count]
+        if i not in self.decoded:
+            start = self.offset + self.offsets[i]
+            end = self.offset + self.offsets[i + 1]
+            self.decoded[i] = self.mm[start:end].decode('utf-8')
+        return self.decoded[i]
+
+    def append(self, s):
+        self.added.append(s)
@@ -90,3 +90,18 @@ class EdgeType(object):
         edges = EdgeType.getAll()
         edges.remove(EdgeType.VARIANT_OF)
         return edges
+
+    # The types of an edge in the graph are stored as a bit mask with bit
+    # (1 << edgeType) set for each type, so that filtering edges by a set of
+    # types is a single AND.
+
+    @staticmethod
+    def getMask(edgeTypes):
+        mask = 0
+        for edgeType in edgeTypes:
+            mask |= 1 << edgeType
+        return mask
+
+    @staticmethod
+    def getTypes(mask):
+        return [edgeType for edgeType in EdgeType.getAll() if mask & (1 << edgeType)]
@@ -0,0 +1,71 @@
+from array import array
+from transitionMatrix import TransitionMatrix
+
+class GraphSnapshot(object):
+    # A frozen, compact copy of a PfisGraph for the prediction algorithms to
+    # walk. Nodes get integer ids, and the edges are stored in compressed
+    # sparse row (CSR) form: the neighbors of node i are
+    # indices[offsets[i]:offsets[i + 1]] and the type masks of those edges
+    # (see EdgeType.getMask) are the same slice of edgeTypes. Every undirected
+    # edge is stored once in each direction. Only the topology is copied:
+    # it is what PfisGraph.version tracks, while node attributes such as
+    # types can change without a new version and are read from the graph.
+    #
+    # Nodes and neighbors keep the iteration order of the networkx graph, so
+    # an algorithm walking the snapshot visits them in the same order as one
+    # walking the graph and gets the same results.
+
+    def __init__(self, graph, version):
+        # The PfisGraph version this snapshot was taken at
+        self.version = version
+
+        adjacency = graph.adj
+        self.fqns = list(adjacency)
+        self.ids = dict((fqn, i) for i, fqn in enumerate(self.fqns))
+
+        self.offsets = array('i', [0])
+        self.indices = array('i')
+        self.edgeTypes = array('i')
+
+        for fqn in self.fqns:
+            neighbors = adjacency[fqn]
+            for neighbor in neighbors:
+                self.indices.append(self.ids[neighbor])
+                self.edgeTypes.append(neighbors[neighbor]['types'])
+            self.offsets.append(len(self.indices))
+
+        # Edge type mask -> {node id: neighbor ids}
+        self.__neighbors = {}
+        # Edge type mask -> TransitionMatrix
+        self.__transitionMatrices = {}
+
+    def getNumberOfNodes(self):
+        return len(self.fqns)
+
+    def getId(self, fqn):
+        # Returns the id of the node, or None if it is not in the snapshot
+        return self.ids.get(fqn)
+
+    def getFqn(self, nodeId):
+        return self.fqns[nodeId]
+
+    def getNeighbors(self, nodeId, mask):
+        # Returns the ids of the neighbors joined to the node by an edge of
+        # any type in mask. The snapshot never changes, so the lists are
+        # cached. They are shared and must not be modified.
+        if mask not in self.__neighbors:
+            self.__neighbors[mask] = {}
+        neighborsByNode = self.__neighbors[mask]
+
+        if nodeId not in neighborsByNode:
+            start, end = self.offsets[nodeId], self.offsets[nodeId + 1]
+            indices, edgeTypes = self.indices, self.edgeTypes
+            neighborsByNode[nodeId] = [indices[i] for i in xrange(start, end) if edgeTypes[i] & mask]
+        return neighborsByNode[nodeId]
+
+    def getTransitionMatrix(self, mask):
+        # Returns the TransitionMatrix of the edges of any type in mask,
+        # built on first use
+        if mask not in self.__transitionMatrices:
+            self.__transitionMatrices[mask] = TransitionMatrix(self, mask)
+        return self.__transitionMatrices[mask]
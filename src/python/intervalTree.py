@@ -0,0 +1,128 @@
+import random
+
+class IntervalTree(object):
+    # Intervals [start, end), each stored under a unique key whose first
+    # element is its start, in a treap: a binary search tree ordered by key
+    # that is kept balanced by giving every node a random priority and
+    # keeping each node's priority above its children's. Every node also
+    # keeps the largest end in its subtree, so a search for the intervals
+    # that reach an offset only descends into subtrees that have one.
+    #
+    # find answers a stabbing query: among the intervals with a key up to a
+    # limit, the one with the highest key that contains the offset. Taking
+    # keys up to (offset, ...) makes that the interval containing the offset
+    # that starts last, which for nested intervals is the innermost.
+
+    def __init__(self):
+        self.root = None
+
+    def insert(self, key, end, value):
+        self.root = self.__insert(self.root, IntervalTreeNode(key, end, value))
+
+    def remove(self, key):
+        self.root = self.__remove(self.root, key)
+
+    def find(self, limit, offset):
+        # Returns the value of the interval with the highest key of at most
+        # limit whose end is above offset, or None if there is none. Callers
+        # pick a limit that no interval starting after offset is within.
+        node = self.__find(self.root, limit, offset)
+        if node is None:
+            return None
+        return node.value
+
+    def getLowestKey(self):
+        node = self.root
+        while node.left is not None:
+            node = node.left
+        return node.key
+
+    def __find(self, node, limit, offset):
+        while node is not None and node.maxEnd > offset:
+            if limit < node.key:
+                node = node.left
+                continue
+            # Every key in the left subtree is within the limit, so the right
+            # subtree and this node come first
+            found = self.__find(node.right, limit, offset)
+            if found is not None:
+                return found
+            if node.end > offset:
+                return node
+            node = node.left
+        return None
+
+    def __insert(self, node, newNode):
+        if node is None:
+            return newNode
+        if newNode.priority > node.priority:
+            newNode.left, newNode.right = self.__split(node, newNode.key)
+            newNode.update()
+            return newNode
+        if newNode.key < node.key:
+            node.left = self.__insert(node.left, newNode)
+        else:
+            node.right = self.__insert(node.right, newNode)
+        node.update()
+        return node
+
+    def __remove(self, node, key):
+        if node is None:
+            return None
+        if key == node.key:
+            return self.__merge(node.left, node.right)
+        if key < node.key:
+            node.left = self.__remove(node.left, key)
+        else:
+            node.right = self.__remove(node.right, key)
+        node.update()
+        return node
+
+    def __split(self, node, key):
+        # Splits the subtree into the nodes with keys below key and the rest
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self.__split(node.right, key)
+            node.update()
+            return node, right
+        left, node.left = self.__split(node.left, key)
+        node.update()
+        return left, node
+
+    def __merge(self, left, right):
+        # Joins two subtrees where every key in left is below every key in
+        # right
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self.__merge(left.right, right)
+            left.update()
+            return left
+        right.left = self.__merge(left, right.left)
+        right.update()
+        return right
+
+
+class IntervalTreeNode(object):
+    __slots__ = ['key', 'end', 'value', 'priority', 'maxEnd', 'left', 'right']
+
+    def __init__(self, key, end, value):
+        self.key = key
+        self.end = end
+        self.value = value
+        self.priority = random.random()
+        self.maxEnd = end
+        self.left = None
+        self.right = None
+
+    def update(self):
+        # Works out maxEnd again from the children
+        maxEnd = self.end
+        if self.left is not None and self.left.maxEnd > maxEnd:
+            maxEnd = self.left.maxEnd
+        if self.right is not None and self.right.maxEnd > maxEnd:
+            maxEnd = self.right.maxEnd
+        self.maxEnd = maxEnd
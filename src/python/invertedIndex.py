@@ -0,0 +1,73 @@
+import numpy
+from ranking import Ranking
+
+class InvertedIndex(object):
+    # A TF-IDF cosine similarity search over a CorpusOfMethodContents, as it
+    # is at one version. The postings of word t, the documents it is in and
+    # its count in each, are documents[offsets[t]:offsets[t + 1]] and the
+    # same slice of counts. Words are weighed as in TFIDF, and the norm of
+    # every document is worked out up front.
+    #
+    # A search only scores the documents that share a word with the query.
+    # Every other document has a similarity of 0, and they make up the tied
+    # tail of the Ranking it returns.
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.version = corpus.getVersion()
+
+        matrix = corpus.termDocumentMatrix
+        counts = matrix.getMatrix()
+        postings = counts.tocsc()
+        self.offsets = postings.indptr
+        self.documents = postings.indices
+        self.counts = postings.data
+
+        # log2(number of documents / document frequency), or 0 for words no
+        # document has anymore
+        documentFrequencies = matrix.getDocumentFrequencies()
+        self.idfs = numpy.zeros(matrix.numTerms)
+        inCorpus = documentFrequencies > 0
+        self.idfs[inCorpus] = numpy.log(float(matrix.numDocuments) / documentFrequencies[inCorpus]) / numpy.log(2.0)
+
+        squares = counts.copy()
+        squares.data **= 2
+        self.norms = numpy.sqrt(squares.dot(self.idfs * self.idfs))
+
+    def search(self, queryMethodFqn):
+        # Returns the Ranking of the corpus's methods by their similarity to
+        # the query method, most similar first
+        documents = []
+        products = []
+        queryNorm = 0.0
+        for termId, count in self.corpus.dictionary.doc2bow(self.corpus.getMethodContentsForFqn(queryMethodFqn)):
+            # Words in every document weigh 0
+            if self.idfs[termId] == 0:
+                continue
+            queryNorm += (count * self.idfs[termId]) ** 2
+            start, end = self.offsets[termId], self.offsets[termId + 1]
+            documents.append(self.documents[start:end])
+            products.append(self.counts[start:end] * (count * self.idfs[termId] * self.idfs[termId]))
+
+        methodFqns = self.corpus.methodFqns
+        mapMethodsToScore = {}
+        if len(documents) > 0:
+            # Adds up the products of each document in the order of the
+            # words, as a matrix-vector product would
+            scored, positions = numpy.unique(numpy.concatenate(documents), return_inverse=True)
+            sims = numpy.bincount(positions, weights=numpy.concatenate(products))
+            sims = sims / self.norms[scored] / numpy.sqrt(queryNorm)
+
+            # Similarities have the single precision of a gensim index
+            for document, sim in zip(scored, sims.astype(numpy.float32)):
+                mapMethodsToScore[methodFqns[document]] = sim
+        else:
+            scored = []
+
+        def getTail():
+            isScored = numpy.zeros(len(methodFqns), dtype=bool)
+            isScored[scored] = True
+            return [methodFqns[document] for document in numpy.flatnonzero(~isScored)]
+
+        return Ranking([methodFqns[document] for document in scored], mapMethodsToScore, reverse=True,
+                       numTail=len(methodFqns) - len(scored), getTail=getTail)
@@ -10,10 +10,6 @@ class JavaScriptHelper (AbstractLanguageHelper):
 	METHOD_TARGET_REGEX = re.compile(r'L/hexcom/(.*?)/.*?([a-z|A-Z]+).js.*?;.(.*?)\(.*')
 	OUTER_CLASS_REGEX = re.compile(r'(.*.js).*')
 
-	TEXT_SELECTION_OFFSET_QUERY = "SELECT timestamp, action, target, referrer FROM logger_log" \
-								  " WHERE action = 'Text selection offset' AND target like '%.js%'" \
-								  " ORDER BY timestamp"
-
 	def __init__(self):
 		fileExtension = ".js"
 		normalizedPathRegex = r"(.*)\.js"
@@ -43,6 +39,10 @@ class JavaScriptHelper (AbstractLanguageHelper):
 			raise Exception("Incorrect fqn: ", fqnToContainer)
 
 
+	def includeTextSelectionOffset(self, filePath):
+		# Only selections in JavaScript files are navigations
+		return '.js' in filePath.lower()
+
 	def isMethodFqn(self, filePathOrFqn):
 		if self.METHOD_TARGET_REGEX.match(filePathOrFqn) != None:
 			return True
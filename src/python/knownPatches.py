@@ -1,5 +1,7 @@
 from defaultPatchStrategy import DefaultPatchStrategy
 from variantPatchStrategy import VariantPatchStrategy
+from intervalTree import IntervalTree
+import sys
 
 
 class KnownPatches(object):
@@ -34,7 +36,7 @@ class KnownPatches(object):
             # file
             #TODO: Not inlined to handle edge case : files or classes with no methods
             if norm not in self.files:
-                self.files[norm] = []
+                self.files[norm] = FilePatches()
                 
             # Add the method if it doesn't already exist in the file
             if self.langHelper.isMethodFqn(filePathOrFqn):
@@ -55,15 +57,9 @@ class KnownPatches(object):
         if norm == '' or norm not in self.files:
             return None
         
-        methods = self.files[norm]
-
-        surroundingMethods = [method for method in methods if method.isOffsetInMethod(offset)]
-
-        if surroundingMethods is not None and len(surroundingMethods) > 0:
-            sortedSurroundingMethods = sorted(surroundingMethods, key=lambda method:method.startOffset, reverse=True)
-            return sortedSurroundingMethods[0]
-
-        return None
+        # If methods are nested, the innermost one (the one with the highest
+        # starting offset) is returned
+        return self.files[norm].findMethodByOffset(offset)
     
     def isOffsetInGap(self, filePath, offset):
         # Because there is no gap between the file header and the 1st method, we
@@ -77,15 +73,10 @@ class KnownPatches(object):
         if len(methods) == 0:
             return False
         
-        lowestOffset = methods[0].startOffset
-        
-        for method in methods:
-            if method.startOffset < lowestOffset:
-                lowestOffset = method.startOffset
-            if method.isOffsetInMethod(offset):
-                return False
+        if methods.findMethodByOffset(offset) is not None:
+            return False
         
-        if offset < lowestOffset:
+        if offset < methods.getLowestOffset():
             # We are in what will eventually be the header, so return False
             return False
         
@@ -111,3 +102,43 @@ class KnownPatches(object):
                 s += str(methodPatch) + '\n'
                 
         return s
+
+
+class FilePatches(list):
+    # The method patches known in one file, in the order they became known.
+    # Alongside the list, the patches are kept in an IntervalTree keyed by
+    # (startOffset, -position), so that finding the method at an offset does
+    # not scan the whole file, however the methods nest. The negated
+    # position makes, among patches with the same start, the one that
+    # became known first the one found. The MethodPatch setters keep the
+    # tree up to date when a declaration's offset or length changes.
+
+    def __init__(self):
+        list.__init__(self)
+        self.__tree = IntervalTree()
+        self.__positions = {}
+
+    def append(self, method):
+        self.__positions[method] = len(self)
+        list.append(self, method)
+        method.filePatches.append(self)
+        self.addToIndex(method)
+
+    def addToIndex(self, method):
+        # Patches without an offset or length yet contain no offset
+        if method.startOffset < 0 or method.length < 0:
+            end = -sys.maxint - 1
+        else:
+            end = method.startOffset + method.length
+        self.__tree.insert((method.startOffset, -self.__positions[method]), end, method)
+
+    def removeFromIndex(self, method):
+        self.__tree.remove((method.startOffset, -self.__positions[method]))
+
+    def findMethodByOffset(self, offset):
+        # The innermost method containing the offset is the one that starts
+        # last among those starting at or before it
+        return self.__tree.find((offset, sys.maxint), offset)
+
+    def getLowestOffset(self):
+        return self.__tree.getLowestKey()[0]
@@ -0,0 +1,73 @@
+import cPickle
+import hashlib
+import os
+
+class NavigationPathCache(object):
+    # Building a navigation path walks every declaration in the log, detects
+    # PFIG headers and removes gaps. The result only depends on the database,
+    # the language helper and the project source (the headers are read from
+    # it), so the resolved paths are kept in a sidecar file keyed by a hash of
+    # those three. Each path is stored under its navigation path type.
+
+    # Bump this when the way paths are built changes, so old caches are not
+    # reused.
+    VERSION = 1
+
+    __CHUNK_SIZE = 1 << 20
+
+    def __init__(self, filePath, dbFilePath, langHelper, projectFolderPath):
+        self.filePath = filePath
+        self.key = NavigationPathCache.computeKey(dbFilePath, langHelper, projectFolderPath)
+        self.__entries = {}
+
+        if os.path.exists(filePath):
+            f = open(filePath, 'rb')
+            try:
+                key, entries = cPickle.load(f)
+                if key == self.key:
+                    self.__entries = entries
+            except (cPickle.UnpicklingError, EOFError, ValueError, AttributeError, ImportError):
+                print "Ignoring unreadable navigation path cache " + filePath
+            finally:
+                f.close()
+
+    @staticmethod
+    def computeKey(dbFilePath, langHelper, projectFolderPath):
+        print "Hashing the database and project source..."
+        sha = hashlib.sha1()
+        sha.update(str(NavigationPathCache.VERSION) + '\0' + langHelper.__class__.__name__ + '\0')
+        NavigationPathCache.__hashFile(sha, dbFilePath)
+
+        for root, dirs, files in os.walk(projectFolderPath):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                sha.update(os.path.relpath(path, projectFolderPath) + '\0')
+                NavigationPathCache.__hashFile(sha, path)
+        print "Done."
+        return sha.hexdigest()
+
+    @staticmethod
+    def __hashFile(sha, path):
+        f = open(path, 'rb')
+        chunk = f.read(NavigationPathCache.__CHUNK_SIZE)
+        while chunk:
+            sha.update(chunk)
+            chunk = f.read(NavigationPathCache.__CHUNK_SIZE)
+        f.close()
+
+    def get(self, name):
+        # Returns what was stored for the given navigation path type, or None
+        return self.__entries.get(name)
+
+    def put(self, name, value):
+        self.__entries[name] = value
+
+        f = open(self.filePath + '.tmp', 'wb')
+        cPickle.dump((self.key, self.__entries), f, cPickle.HIGHEST_PROTOCOL)
+        f.close()
+
+        # Replace the old file only once the new one is complete
+        if os.path.exists(self.filePath):
+            os.remove(self.filePath)
+        os.rename(self.filePath + '.tmp', self.filePath)
@@ -1,18 +1,18 @@
-import sqlite3
-import iso8601
 from pfigFileHeader import PFIGFileHeader
 from knownPatches import KnownPatches
 from navigation import Navigation
 from navigation import FileNavigation
+from eventStore import EventStore
 
 class NavigationPath(object):
 
     DEFAULT = "Default"
     VARIANT_AWARE = "VariantAware"
     VARIANT_AWARE_COLLAPSED = "VariantAwareCollapsed"
-    METHOD_DECLARATIONS_QUERY = "SELECT timestamp, action, target, referrer from logger_log WHERE action IN ('Method declaration', 'Method declaration offset', 'Method declaration length') AND timestamp <= ? ORDER BY timestamp"
+    TEXT_SELECTION_OFFSET_ACTIONS = ('Text selection offset',)
+    METHOD_DECLARATION_ACTIONS = ('Method declaration', 'Method declaration offset', 'Method declaration length')
 
-    def __init__(self, dbFilePath, langHelper, projectFolderPath, verbose = False):
+    def __init__(self, dbFilePath, langHelper, projectFolderPath, verbose = False, cache = None, defaultPath = None):
         self.dbFilePath = dbFilePath
         self.langHelper = langHelper
         self.projectFolderPath = projectFolderPath
@@ -20,42 +20,63 @@ class NavigationPath(object):
 
         self.__fileNavigations = []
         self._navigations = []
+        # The PFIG headers found while building the path
+        self._headers = []
 
         self._name = NavigationPath.DEFAULT
         #Do not account for similar patches across variants
         self.knownPatches = KnownPatches(langHelper)
 
-        conn = sqlite3.connect(self.dbFilePath)
-        conn.row_factory = sqlite3.Row
-
-        if self.VERBOSE_PATH:
-            print 'Building path...'
-        self.__findFileNavigationsInDb(conn)
-        self.__findMethodsForFileNavigations(conn)
-        if self.VERBOSE_PATH:
-            print 'Done building path.'
+        # Offset and length events whose method had not been declared yet when
+        # they were replayed. See __replayMethodDeclarations.
+        self.__pendingDeclarationUpdates = {}
+
+        events = EventStore.forDatabase(self.dbFilePath)
+
+        # A path derived from an already built one (see
+        # VariantAwareNavigationPath) starts from its navigations. Otherwise
+        # the path is loaded from the cache if it has it, or built from the
+        # event store and then cached.
+        if defaultPath is not None:
+            self._navigations = list(defaultPath._navigations)
+            self._headers = defaultPath._headers
+        elif cache is not None and cache.get(NavigationPath.DEFAULT) is not None:
+            print 'Loading navigation path from ' + cache.filePath + '...'
+            self._navigations, self._headers = cache.get(NavigationPath.DEFAULT)
+            # The headers are part of the log that the graphs and lexical
+            # models read, so they are put back into the event store.
+            for header in self._headers:
+                PFIGFileHeader.addHeaderToEventStore(header, events)
+            print 'Done.'
+        else:
+            if self.VERBOSE_PATH:
+                print 'Building path...'
+            self.__findFileNavigations(events)
+            self.__findMethodsForFileNavigations(events)
+            if self.VERBOSE_PATH:
+                print 'Done building path.'
+            if cache is not None:
+                cache.put(NavigationPath.DEFAULT, (self._navigations, self._headers))
         self._printNavigations()
-        conn.close()
 
 
     def getNavPathType(self):
         return self._name
 
-    def __findFileNavigationsInDb(self, conn):
+    def __findFileNavigations(self, events):
         # Here, we find all the instances of Text selection offset actions in
         # the PFIG log. These are stored into the self.__fileNavigations list. We
         # remove any obvious duplicates that have the same file path and offset
         # in this function. We store time stamps here since they will be used to
         # determine if self.knownMethods entries need to be added or updated.
-        c = conn.cursor()
-        c.execute(self.langHelper.TEXT_SELECTION_OFFSET_QUERY)
-
         prevFilePath = None
         prevOffset = None
 
-        for row in c:
-            timestamp, filePath, offset = \
-                str(iso8601.parse_date(row['timestamp'])), row['target'], int(row['referrer'])
+        for timestamp, _, filePath, offset in events.getEvents(self.TEXT_SELECTION_OFFSET_ACTIONS, 0):
+            if not self.langHelper.includeTextSelectionOffset(filePath):
+                continue
+
+            offset = int(offset)
 
             if prevFilePath != filePath or prevOffset != offset: #This is for a Java PFIG bug / peculiarity -- duplicate navs to same offset in  Java DB
                     if self.langHelper.hasCorrectExtension(filePath):
@@ -63,53 +84,47 @@ class NavigationPath(object):
 
             prevFilePath = filePath
             prevOffset = offset
-        c.close()
 
-    def __findMethodsForFileNavigations(self, conn):
+    def __findMethodsForFileNavigations(self, events):
         # Here we map the file paths and offsets in the fileNavigations list to
-        # FQNs of methods. This is done by querying for all the Method
+        # FQNs of methods. This is done by replaying all the Method
         # declarations within the database and storing that data to the
         # self.knownMethods object. The insertions into knownMethods will create
         # entries if they are new or update them if they already exist. Since
         # code can be changed between navigations, we need to update
         # self.knownMethods to reflect the most recent state of the code up to
         # each navigation.
+        # The declarations and the navigations are both ordered by timestamp, so
+        # we walk them together once: before each navigation we only replay the
+        # declarations that happened since the previous navigation.
         # After building the known methods, we test an entry from
         # fileNavigations against the set of known methods by offset. This is
         # what maps Text selection offsets to methods.
         prevNavigation = None
         postProcessing = False
 
+        # The declarations are copied out of the store up front, so the PFIG
+        # headers added to it while walking do not shift the replay position.
+        declarations = events.getEvents(self.METHOD_DECLARATION_ACTIONS, 0)
+        nextDeclaration = 0
+
         # Iterate over the data gathered from the Text selection offsets
         for i in range(len(self.__fileNavigations)):
             toFileNavigation = self.__fileNavigations[i]
             if self.VERBOSE_PATH:
                 print '\tProcessing text selection offset: ' + str(toFileNavigation)
 
-            # For every navigation's timestamp, we fill the knownMethods object
-            # with the details of every method declaration up to the timestamp
-            # of the toFileNavigation. The knownMethods object will be queried to
-            # determine in which method (if any) a text selection offset occurs.
+            # For every navigation's timestamp, we bring the knownMethods object
+            # up to date with the details of every method declaration up to the
+            # timestamp of the toFileNavigation. The knownMethods object will be
+            # queried to determine in which method (if any) a text selection
+            # offset occurs.
 
             # Note that the queries here are by a method's FQN. This allows us
             # to update the method's declaration info if it gets updated at some
             # point in the future.
 
-            c = conn.execute(self.METHOD_DECLARATIONS_QUERY, [toFileNavigation.timestamp])
-            for row in c:
-                action, target, referrer = row['action'], \
-                    row['target'], row['referrer']
-
-                if action == 'Method declaration':
-                    self.knownPatches.addFilePatch(referrer)
-                elif action == 'Method declaration offset':
-                    method = self.knownPatches.findMethodByFqn(target)
-                    if method is not None:
-                        method.startOffset = int(referrer)
-                elif action == 'Method declaration length':
-                    method = self.knownPatches.findMethodByFqn(target)
-                    if method is not None:
-                        method.length = int(referrer);
+            nextDeclaration = self.__replayMethodDeclarations(declarations, nextDeclaration, toFileNavigation.timestamp)
 
             # Recall that navigations contains the navigation data after its
             # been translated to methods and headers
@@ -126,7 +141,7 @@ class NavigationPath(object):
             if len(self._navigations) > 0:
                 prevNavigation = self._navigations[-1]
                 fromFileNavigation = prevNavigation.toFileNav.clone()
-                self.__addPFIGFileHeadersIfNeeded(conn, prevNavigation, toFileNavigation)
+                self.__addPFIGFileHeadersIfNeeded(events, prevNavigation, toFileNavigation)
                 fromMethodPatch = self.knownPatches.findMethodByOffset(fromFileNavigation.filePath, fromFileNavigation.offset)
 
 
@@ -152,11 +167,49 @@ class NavigationPath(object):
                         postProcessing = True
                         navigation.fromFileNav.isGap = True
                         prevNavigation.toFileNav.isGap = True
-            c.close()
 
         if postProcessing:
             self.__removeGapNavigations()
 
+    def __replayMethodDeclarations(self, declarations, start, timestamp):
+        # Applies the declarations from index start up to and including the
+        # given timestamp to knownPatches. Returns the index of the first
+        # declaration that was not replayed.
+
+        # An offset or length can be logged before the declaration of its
+        # method. Those are held back and applied at the start of the next
+        # replay if the method is known by then, unless a later event for the
+        # same method already replaced them.
+        for fqn in self.__pendingDeclarationUpdates.keys():
+            method = self.knownPatches.findMethodByFqn(fqn)
+            if method is not None:
+                for action, value in self.__pendingDeclarationUpdates.pop(fqn).items():
+                    self.__updateMethodDeclaration(method, action, value)
+
+        i = start
+        while i < len(declarations) and declarations[i][0] <= timestamp:
+            _, action, target, referrer = declarations[i]
+
+            if action == 'Method declaration':
+                self.knownPatches.addFilePatch(referrer)
+            else:
+                method = self.knownPatches.findMethodByFqn(target)
+                if method is not None:
+                    self.__updateMethodDeclaration(method, action, int(referrer))
+                    if target in self.__pendingDeclarationUpdates:
+                        self.__pendingDeclarationUpdates[target].pop(action, None)
+                else:
+                    self.__pendingDeclarationUpdates.setdefault(target, {})[action] = int(referrer)
+            i += 1
+
+        return i
+
+    def __updateMethodDeclaration(self, method, action, value):
+        if action == 'Method declaration offset':
+            method.startOffset = value
+        elif action == 'Method declaration length':
+            method.length = value
+
     def __removeGapNavigations(self):
         # We do a second pass over the navigations so that we remove any
         # parts of the navigation that have been previously identified as being
@@ -196,7 +249,7 @@ class NavigationPath(object):
 
         self._navigations = finalNavigations
 
-    def __addPFIGFileHeadersIfNeeded(self, conn, prevNav, currToFileNav):
+    def __addPFIGFileHeadersIfNeeded(self, events, prevNav, currToFileNav):
         # If it's the first navigation, don't do anything
         if prevNav is None:
             return
@@ -211,7 +264,7 @@ class NavigationPath(object):
             if previousNavToMethod is None:
                 if self.VERBOSE_PATH:
                         print '\tChecking if ' + str(prevNav.toFileNav) + ' is a header...'
-                headerData = PFIGFileHeader.addPFIGJavaFileHeader(conn, prevNav, currToFileNav, self.projectFolderPath, self.langHelper)
+                headerData = PFIGFileHeader.addPFIGJavaFileHeader(events, prevNav, currToFileNav, self.projectFolderPath, self.langHelper)
 
                 # If headerData comes back as not None, then it was indeed a
                 # header and needs to be added to navigation and
@@ -219,6 +272,7 @@ class NavigationPath(object):
                 if headerData is not None:
                     if self.VERBOSE_PATH:
                         print '\tConverted to ' + headerData.fqn
+                    self._headers.append(headerData)
 
                     # Add to the knownPatches
                     self.knownPatches.addFilePatch(headerData.fqn)
@@ -7,11 +7,39 @@ class MethodPatch(object):
 
     def __init__(self, fqn):
         self.fqn = fqn
-        self.startOffset = -1
-        self.length = -1
+        self.__startOffset = -1
+        self.__length = -1
         self.uuid = uuid.uuid1()
         self.variantInfo = None
 
+        # The FilePatches lists this patch was added to. Their offset indexes
+        # are updated whenever the offset or length changes.
+        self.filePatches = []
+
+    @property
+    def startOffset(self):
+        return self.__startOffset
+
+    @startOffset.setter
+    def startOffset(self, startOffset):
+        for filePatches in self.filePatches:
+            filePatches.removeFromIndex(self)
+        self.__startOffset = startOffset
+        for filePatches in self.filePatches:
+            filePatches.addToIndex(self)
+
+    @property
+    def length(self):
+        return self.__length
+
+    @length.setter
+    def length(self, length):
+        for filePatches in self.filePatches:
+            filePatches.removeFromIndex(self)
+        self.__length = length
+        for filePatches in self.filePatches:
+            filePatches.addToIndex(self)
+
     def isOffsetInMethod(self, offset):
         endOffset = self.startOffset + self.length
         if self.startOffset < 0 or self.length < 0:
@@ -1,24 +1,21 @@
-import iso8601
-import datetime
 from __builtin__ import True
 
 class PFIGFileHeader:
-    __INSERT_QUERY = "INSERT INTO logger_log (user, timestamp, action, target, referrer, agent) VALUES (?, ?, ?, ?, ?, ?)"
-    __METHOD_DECLARATION_OFFSETS_DESC_UNTIL_TIME_QUERY = "SELECT timestamp, action, target, referrer FROM logger_log " \
-                                                         "WHERE action = 'Method declaration offset' " \
-                                                         "and timestamp < ? ORDER BY timestamp DESC"
+    __METHOD_DECLARATION_OFFSET_ACTIONS = ('Method declaration offset',)
 
 
     @staticmethod
-    def addPFIGJavaFileHeader(conn, prevNav, fileNavigation, projectFolderPath, langHelper):
+    def addPFIGJavaFileHeader(eventStore, prevNav, fileNavigation, projectFolderPath, langHelper):
         # This function replaces the fromNav in the navigation with a pfisHeader
-        # and also adds that header to the database precisely after it was first
-        # visited.
+        # and also adds that header to the event store precisely after it was
+        # first visited, so that the graphs and the lexical models see it. The
+        # store is what gets compiled to the event file, so headers that are
+        # already in it (from an earlier run) are not added again.
         className = langHelper.normalize(prevNav.toFileNav.filePath)
         classFilePath = langHelper.getFileName(projectFolderPath, className, langHelper.FileExtension)
         
-        c = conn.cursor()
-        c.execute(PFIGFileHeader.__METHOD_DECLARATION_OFFSETS_DESC_UNTIL_TIME_QUERY, [fileNavigation.timestamp])
+        offsets = eventStore.getEvents(PFIGFileHeader.__METHOD_DECLARATION_OFFSET_ACTIONS,
+                                       0, fileNavigation.timestamp)
         lowestOffset = -1
         fqn = None
         pfigHeader = None
@@ -26,16 +23,14 @@ class PFIGFileHeader:
         # Iterate over all the method declarations. If the normalized class
         # names match then we check the offset, looking for the smallest one.
         # from 0 to that offset will be considered the header file.
-        for row in c:
-            methodFqn, offset = row['target'], int(row['referrer'])
+        for _, _, methodFqn, offset in reversed(offsets):
+            offset = int(offset)
             
             # Get the class of the method    
             if className == langHelper.normalize(methodFqn):
                 if lowestOffset == -1 or offset < lowestOffset:
                     lowestOffset = offset
                     fqn = methodFqn[0:methodFqn.rfind('.')]
-                    
-        c.close()
         
         makeHeader = False
         
@@ -57,11 +52,11 @@ class PFIGFileHeader:
             makeHeader = True
             
         if makeHeader:
-            dt = iso8601.parse_date(prevNav.toFileNav.timestamp)
-            dt += datetime.timedelta(milliseconds=1)
+            timestamp = prevNav.toFileNav.timestamp + 1
             
-            pfigHeader = HeaderData(fqn, lowestOffset, dt)
-            PFIGFileHeader.__insertHeaderIntoDb(pfigHeader, classFilePath, conn)     
+            pfigHeader = HeaderData(fqn, lowestOffset, timestamp)
+            PFIGFileHeader.__readHeaderContents(pfigHeader, classFilePath)
+            PFIGFileHeader.addHeaderToEventStore(pfigHeader, eventStore)     
         
         # This will return None if the location was not found or if it is in a 
         # gap between two methods. Either way it shouldn't be counted as a
@@ -69,33 +64,35 @@ class PFIGFileHeader:
         return pfigHeader
     
     @staticmethod
-    def __insertHeaderIntoDb(pfigHeader, classFilePath, conn):
+    def __readHeaderContents(pfigHeader, classFilePath):
         f = open(classFilePath, 'r')
         # This will ready the entire file when given negative number
-        contents = f.read(pfigHeader.length)
+        pfigHeader.contents = f.read(pfigHeader.length)
+        f.close()
 
         if pfigHeader.length == -1:
-            pfigHeader.length = len(contents)
+            pfigHeader.length = len(pfigHeader.contents)
 
-        dummy = "auto-generated"
+    @staticmethod
+    def addHeaderToEventStore(pfigHeader, eventStore):
+        # Also used to restore the headers of a cached navigation path
         timestamp = pfigHeader.timestamp
+        if eventStore.hasEvent(timestamp, 'Method declaration', pfigHeader.fqnClass, pfigHeader.fqn):
+            return
         
-        c = conn.cursor()
-        c.execute(PFIGFileHeader.__INSERT_QUERY, [dummy, timestamp, 'Method declaration', pfigHeader.fqnClass, pfigHeader.fqn, dummy])
-        c.execute(PFIGFileHeader.__INSERT_QUERY, [dummy, timestamp, 'Method declaration offset', pfigHeader.fqn, str(0), dummy])
-        c.execute(PFIGFileHeader.__INSERT_QUERY, [dummy, timestamp, 'Method declaration length', pfigHeader.fqn, str(pfigHeader.length), dummy])
-        c.execute(PFIGFileHeader.__INSERT_QUERY, [dummy, timestamp, 'Method declaration scent', pfigHeader.fqn, contents, dummy])
-        conn.commit()
-        c.close()
+        eventStore.addEvent(timestamp, 'Method declaration', pfigHeader.fqnClass, pfigHeader.fqn)
+        eventStore.addEvent(timestamp, 'Method declaration offset', pfigHeader.fqn, str(0))
+        eventStore.addEvent(timestamp, 'Method declaration length', pfigHeader.fqn, str(pfigHeader.length))
+        eventStore.addEvent(timestamp, 'Method declaration scent', pfigHeader.fqn, pfigHeader.contents)
         
 # TODO: Can this class and the MethodData class be replaced/merged with the
 # FileNavigation class? They all seem to hold the same data...
         
 class HeaderData:
     # A class to simply hold the PFIG header data.
-    def __init__(self, fqn, length, dt):
+    def __init__(self, fqn, length, timestamp):
         self.fqn = fqn
         self.fqnClass = fqn[0:fqn.find(';') + 1]
         self.length = length
-        ms = dt.microsecond / 1000
-        self.timestamp = dt.strftime("%Y-%m-%d %H:%M:%S." + str(ms))
\ No newline at end of file
+        self.timestamp = timestamp
+        self.contents = None
\ No newline at end of file
@@ -7,6 +7,9 @@ from xmlAlgorithmOptions import XMLOptionsParser
 from predictor import Predictor
 from navpath import NavigationPath
 from variantAwareNavigationPath import VariantAwareNavigationPath
+from navPathCache import NavigationPathCache
+from workingDatabase import WorkingDatabase
+from eventStore import EventStore
 
 def print_usage():
 	print "python pfis3.py -d <path to PFIG database> -s <path to stop words file>"
@@ -44,6 +47,8 @@ def parseArgs():
 
 	def setConventionBasedArguments(argsMap):
 		argsMap["tempDbPath"] = argsMap["dbPath"] + "_temp"
+		argsMap["eventsPath"] = argsMap["dbPath"] + "_events"
+		argsMap["navPathCachePath"] = argsMap["dbPath"] + "_navpath"
 
 	try:
 		opts, _ = getopt.getopt(sys.argv[1:], "d:s:l:p:o:x:n:")
@@ -68,32 +73,46 @@ def main():
 	#Initialize the processor with the appropriate language specific processor
 	langHelper = LanguageHelperFactory.getLanguageHelper(args['language'])
 
-	# Start by making a working copy of the database
-	workingDbCopy = args['tempDbPath']
-	copyDatabase(args['dbPath'], workingDbCopy)
 	# Load the stop words file
 	stopWords = loadStopWords(args['stopWordsPath'])
 
-	langHelper.performDBPostProcessing(workingDbCopy)
+	# The models only read the log through the event store of the working
+	# database. If the database was already compiled to an event file and its
+	# navigation path is cached, both are loaded instead of copying and
+	# post-processing the database.
+	workingDbCopy = args['tempDbPath']
+	navPathCache = NavigationPathCache(args['navPathCachePath'], args['dbPath'], langHelper, projSrc)
+	if navPathCache.get(NavigationPath.DEFAULT) is not None \
+			and EventStore.isCompiledFileCurrent(args['eventsPath'], args['dbPath'], langHelper):
+		EventStore.register(workingDbCopy, EventStore.fromCompiledFile(args['eventsPath']))
+		navPath = NavigationPath(workingDbCopy, langHelper, projSrc, cache=navPathCache)
+	else:
+		# Start by making a working copy of the database
+		copyDatabase(args['dbPath'], workingDbCopy)
+		langHelper.performDBPostProcessing(workingDbCopy)
+
+		# Index the working copy so that loading the events is a range seek
+		# instead of a table scan
+		prepareWorkingDatabase(workingDbCopy)
+		navPath = compileEvents(workingDbCopy, args['eventsPath'], langHelper, projSrc, navPathCache)
 
 	# Determine the algorithms to use
 	xmlParser = XMLOptionsParser(args['xml'], langHelper, workingDbCopy, projSrc, stopWords)
 
 	graphAlgorithmsMapWithDefaultNavPath = xmlParser.getAlgorithms(navPathType="Default")
 	if len(graphAlgorithmsMapWithDefaultNavPath.keys()) > 0:
-		navPath = NavigationPath(workingDbCopy, langHelper, projSrc)
 		runAlgorithms(args, graphAlgorithmsMapWithDefaultNavPath, navPath)
 
 	#TODO: Collapse all navpaths into a single one for PFIS-V
 
 	graphAlgorithmsMapForVariantAwarePath = xmlParser.getAlgorithms(navPathType="VariantAware")
 	if len(graphAlgorithmsMapForVariantAwarePath.keys()) > 0:
-		variantAwareNavPath = VariantAwareNavigationPath(workingDbCopy, langHelper, projSrc, collapse=False)
+		variantAwareNavPath = VariantAwareNavigationPath(navPath, collapse=False, cache=navPathCache)
 		runAlgorithms(args, graphAlgorithmsMapForVariantAwarePath, variantAwareNavPath)
 
 	graphAlgorithmsMapForVariantAwarePath = xmlParser.getAlgorithms(navPathType="VariantAwareCollapsed")
 	if len(graphAlgorithmsMapForVariantAwarePath.keys()) > 0:
-		variantAwareNavPath = VariantAwareNavigationPath(workingDbCopy, langHelper, projSrc, collapse=True)
+		variantAwareNavPath = VariantAwareNavigationPath(navPath, collapse=True, cache=navPathCache)
 		runAlgorithms(args, graphAlgorithmsMapForVariantAwarePath, variantAwareNavPath)
 
 	# Exit gracefully
@@ -132,5 +151,21 @@ def copyDatabase(dbpath, newdbpath):
 	shutil.copyfile(dbpath, newdbpath)
 	print "Done."
 
+def prepareWorkingDatabase(dbpath):
+	WorkingDatabase.prepare(dbpath)
+	WorkingDatabase.printQueryPlans(dbpath, [
+		("Event store", EventStore.LOAD_QUERY)
+	])
+
+def compileEvents(dbpath, eventspath, langHelper, projSrc, navPathCache):
+	# Building (or loading) the default navigation path adds the PFIG headers
+	# to the event store, so it is done before the store is saved. Later runs
+	# then start from a log that already has its headers. Only this path is
+	# written to the cache, so the cached headers always come from a store
+	# that was loaded from the database.
+	navPath = NavigationPath(dbpath, langHelper, projSrc, cache=navPathCache)
+	EventStore.forDatabase(dbpath).save(eventspath, langHelper)
+	return navPath
+
 if __name__ == "__main__":
 	main()
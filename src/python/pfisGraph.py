@@ -1,25 +1,21 @@
 import networkx as nx
 import re
-import sqlite3
 
 from nltk.stem import PorterStemmer
 from knownPatches import KnownPatches
 from graphAttributes import NodeType
 from graphAttributes import EdgeType
+from eventStore import EventStore
+from graphSnapshot import GraphSnapshot
 
 class PfisGraph(object):
 
-    SCENT_QUERY = "SELECT action, target, referrer FROM logger_log WHERE action IN " \
-                  "('Package', 'Imports', 'Extends', 'Implements', " \
-                  "'Method declaration', 'Constructor invocation', 'Method invocation', 'Variable declaration', 'Variable type', " \
-                  "'Constructor invocation scent', 'Method declaration scent', 'Method invocation scent') " \
-                  "AND timestamp >= ? AND timestamp < ?"
-    TOPOLOGY_QUERY = "SELECT action, target, referrer FROM logger_log WHERE action IN " \
-                     "('Package', 'Imports', 'Extends', 'Implements', " \
-                     "'Method declaration', 'Constructor invocation', 'Method invocation', 'Variable declaration', 'Variable type') " \
-                     "AND timestamp >= ? AND timestamp < ?"
-    ADJACENCY_QUERY = "SELECT timestamp, action, target, referrer FROM logger_log WHERE action = 'Method declaration offset' " \
-                      "AND timestamp >= ? AND timestamp < ? ORDER BY timestamp"
+    SCENT_ACTIONS = ('Package', 'Imports', 'Extends', 'Implements',
+                     'Method declaration', 'Constructor invocation', 'Method invocation', 'Variable declaration', 'Variable type',
+                     'Constructor invocation scent', 'Method declaration scent', 'Method invocation scent')
+    TOPOLOGY_ACTIONS = ('Package', 'Imports', 'Extends', 'Implements',
+                        'Method declaration', 'Constructor invocation', 'Method invocation', 'Variable declaration', 'Variable type')
+    ADJACENCY_ACTIONS = ('Method declaration offset',)
                       
     REGEX_SPLIT_CAMEL_CASE = re.compile(r'_|\W+|\s+|(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])|(?<=[a-zA-Z])(?=[0-9]+)|(?<=[0-9])(?=[a-zA-Z]+)')
     
@@ -31,34 +27,39 @@ class PfisGraph(object):
         self.VERBOSE_BUILD = verbose
         self.graph = nx.Graph()
 
+        # Incremented on every change to the nodes or edges of the graph
+        self.version = 0
+        # Node -> {edge type mask: neighbors}. An entry is dropped whenever
+        # the edges of its node change. See getNeighborsOfDesiredEdgeTypes.
+        self.__neighborCache = {}
+        # See getSnapshot
+        self.__snapshot = None
+        # The nodes that are methods that can be predicted: of type METHOD
+        # and not excluded by the language helper. Kept up to date as nodes
+        # are added, along with each node's 'predictable' attribute.
+        self.predictableMethods = set()
+
     def updateGraphByOneNavigation(self, prevEndTimeStamp, newEndTimestamp):
-        conn = sqlite3.connect(self.dbFilePath)
-        conn.row_factory = sqlite3.Row
+        events = EventStore.forDatabase(self.dbFilePath)
 
         print 'Updating PFIS Graph...'
 
-        self.__addScentNodesUpTo(conn, prevEndTimeStamp, newEndTimestamp)
-        self.__addTopologyNodesUpTo(conn, prevEndTimeStamp, newEndTimestamp)
-        self.__addAdjacencyNodesUpTo(conn, prevEndTimeStamp, newEndTimestamp)
+        self.__addScentNodesUpTo(events, prevEndTimeStamp, newEndTimestamp)
+        self.__addTopologyNodesUpTo(events, prevEndTimeStamp, newEndTimestamp)
+        self.__addAdjacencyNodesUpTo(events, prevEndTimeStamp, newEndTimestamp)
 
         print 'Done updating PFIS Graph.'
 
-        conn.close()
-
-    def __addScentNodesUpTo(self, conn, prevEndTimestamp, newEndTimestamp):
-        # Inserts nodes into the graph up to a given timestamp in the database
-        # provided by the conn.
+    def __addScentNodesUpTo(self, events, prevEndTimestamp, newEndTimestamp):
+        # Inserts nodes into the graph for the events after prevEndTimestamp up
+        # to newEndTimestamp in the event store.
         print '\tProcessing scent. Adding scent-related nodes...'
         
-        c = conn.cursor()
         # if self.VERBOSE_BUILD:
-        #     print "\tExecuting scent query from ", self.endTimestamp, "to", newEndTimestamp
-        c.execute(self.SCENT_QUERY, [prevEndTimestamp, newEndTimestamp])
+        #     print "\tReading scent events from ", self.endTimestamp, "to", newEndTimestamp
         
-        for row in c:
-            action, target, referrer = \
-                row['action'], self.langHelper.fixSlashes(row['target']), \
-                self.langHelper.fixSlashes(row['referrer'])
+        for _, action, target, referrer in events.getEvents(self.SCENT_ACTIONS, prevEndTimestamp, newEndTimestamp, orderByRowid=True):
+            target, referrer = self.langHelper.fixSlashes(target), self.langHelper.fixSlashes(referrer)
             
             # Note that these can return None if the relation is undefined
             targetNodeType = NodeType.getTargetNodeType(action, target)
@@ -93,30 +94,22 @@ class PfisGraph(object):
                     
                 for word in self.getWordNodes_splitCamelAndStem(referrer):
                     self._addEdge(target, word, targetNodeType, NodeType.WORD, EdgeType.CONTAINS)
-        c.close()
         
         print '\tDone adding scent-related nodes.'
         self.__printGraphStats()
         
-    def __addTopologyNodesUpTo(self, conn, prevEndTimestamp, newEndTimestamp):
+    def __addTopologyNodesUpTo(self, events, prevEndTimestamp, newEndTimestamp):
         # Build the graph according to the code structure recorded by PFIG. See
         # each section of the build for details.
     
         print "\tProcessing topology. Adding location nodes to the graph..."
     
-        c = conn.cursor()
-        c.execute(self.TOPOLOGY_QUERY, [prevEndTimestamp, newEndTimestamp])
-    
-        for row in c:
-            action, target, referrer, = \
-            row['action'], self.langHelper.fixSlashes(row['target']), \
-            self.langHelper.fixSlashes(row['referrer'])
+        for _, action, target, referrer in events.getEvents(self.TOPOLOGY_ACTIONS, prevEndTimestamp, newEndTimestamp, orderByRowid=True):
+            target, referrer = self.langHelper.fixSlashes(target), self.langHelper.fixSlashes(referrer)
             targetNodeType = NodeType.getTargetNodeType(action, target)
             referrerNodeType = NodeType.getReferrerNodeType(action, referrer, self.langHelper)
 
             self.updateTopology(action, target, referrer, targetNodeType, referrerNodeType)
-
-        c.close
     
         print "\tDone processing topology."
         self.__printGraphStats()
@@ -217,23 +210,18 @@ class PfisGraph(object):
                           referrerNodeType,
                           EdgeType.TYPE)
 
-    def __addAdjacencyNodesUpTo(self, conn, prevEndTimestamp, newEndTimestamp):
+    def __addAdjacencyNodesUpTo(self, events, prevEndTimestamp, newEndTimestamp):
         knownPatches = KnownPatches(self.langHelper)
     
         print "\tProcessing adjacency. Adding adjacency edges to the graph..."
     
-        c = conn.cursor()
-        c.execute(self.ADJACENCY_QUERY, [prevEndTimestamp, newEndTimestamp])
-        
-        for row in c:
-            target, referrer = self.langHelper.fixSlashes(row['target']), int(row['referrer'])
+        for _, _, target, referrer in events.getEvents(self.ADJACENCY_ACTIONS, prevEndTimestamp, newEndTimestamp):
+            target, referrer = self.langHelper.fixSlashes(target), int(referrer)
             
             knownPatches.addFilePatch(target);
             method = knownPatches.findMethodByFqn(target);
             method.startOffset = referrer
         
-        c.close()
-        
         adjacentMethodLists = knownPatches.getAdajecentMethods()
         
         for methods in adjacentMethodLists:
@@ -254,17 +242,36 @@ class PfisGraph(object):
     #==============================================================================#
     
     def _addEdge(self, node1, node2, node1Type, node2Type, edgeType):
+        # An edge keeps the mask of its types (see EdgeType.getMask) and how
+        # many times it was added
         if self.graph.has_edge(node1, node2):
-            self.graph.edge[node1][node2]['types'].append(edgeType)
+            edgeData = self.graph.edge[node1][node2]
+            if not edgeData['types'] & (1 << edgeType):
+                edgeData['types'] |= 1 << edgeType
+                self.__edgesChanged([node1, node2])
+            edgeData['count'] += 1
         else:
-            self.graph.add_edge(node1, node2, attr_dict={'types': [edgeType]})
+            self.graph.add_edge(node1, node2, attr_dict={'types': 1 << edgeType, 'count': 1})
+            self.__edgesChanged([node1, node2])
             
-        self.graph.node[node1]['type'] = node1Type
-        self.graph.node[node2]['type'] = node2Type
+        self.__setNodeType(node1, node1Type)
+        self.__setNodeType(node2, node2Type)
 
         if self.VERBOSE_BUILD:
             print "\tAdding edge from", node1, "to", node2, "of type", edgeType
 
+    def __setNodeType(self, node, nodeType):
+        nodeData = self.graph.node[node]
+        if nodeData.get('type') == nodeType and 'predictable' in nodeData:
+            return
+
+        nodeData['type'] = nodeType
+        nodeData['predictable'] = nodeType == NodeType.METHOD and not self.langHelper.excludeMethod(node)
+        if nodeData['predictable']:
+            self.predictableMethods.add(node)
+        else:
+            self.predictableMethods.discard(node)
+
     def __getWordNodes_splitNoStem(self, s):
         # Returns a list of word nodes from the given string after stripping all
         # non-alphanumeric characters. A word node is a tuple containing 'word' and
@@ -317,14 +324,15 @@ class PfisGraph(object):
         variantEdges = 0
         topologyLinkEdges = 0
 
+        topologyLinkMask = EdgeType.getMask([EdgeType.ADJACENT, EdgeType.CALLS, EdgeType.VARIANT_OF])
+        variantMask = EdgeType.getMask([EdgeType.VARIANT_OF])
+
         edge_iter = self.graph.edges_iter()
         for edge in edge_iter:
             edge_data = self.graph.get_edge_data(edge[0], edge[1])
-            if EdgeType.ADJACENT in edge_data["types"]\
-                    or EdgeType.CALLS in edge_data["types"] \
-                    or EdgeType.VARIANT_OF in edge_data["types"]:
+            if edge_data["types"] & topologyLinkMask:
                 topologyLinkEdges = topologyLinkEdges + 1
-            if EdgeType.VARIANT_OF in edge_data["types"]:
+            if edge_data["types"] & variantMask:
                 variantEdges = variantEdges+1
 
 
@@ -346,22 +354,52 @@ class PfisGraph(object):
         print "--------------------------------------------"
 
     def getNeighborsOfDesiredEdgeTypes(self, node, edgeTypes):
-        validNeighbors = []
+        # The graph only changes between navigations, while every algorithm
+        # asks for the neighbors of the same nodes, so the neighbors are
+        # cached per node and set of edge types. The returned list is shared
+        # and must not be modified.
+        mask = EdgeType.getMask(edgeTypes)
 
         equivalentNode = node
         if self.langHelper.isMethodFqn(node):
             equivalentNode = self.getFqnOfEquivalentNode(node)
 
-        for neighbor in self.graph.neighbors(equivalentNode):
-            for edgeType in edgeTypes:
-                if edgeType in self.graph[equivalentNode][neighbor]['types'] and neighbor not in validNeighbors:
-                    validNeighbors.append(neighbor)
+        if equivalentNode in self.__neighborCache and mask in self.__neighborCache[equivalentNode]:
+            return self.__neighborCache[equivalentNode][mask]
 
-        return validNeighbors
+        adjacency = self.graph.adj[equivalentNode]
+        neighbors = [neighbor for neighbor in adjacency if adjacency[neighbor]['types'] & mask]
+        self.__neighborCache.setdefault(equivalentNode, {})[mask] = neighbors
+        return neighbors
+
+    def __edgesChanged(self, nodes):
+        self.version += 1
+        for node in nodes:
+            self.__neighborCache.pop(node, None)
 
     def getAllNeighbors(self, node):
-        edges = EdgeType.getStandardEdgeTypes()
-        return self.getNeighborsOfDesiredEdgeTypes(node, edges)
+        return self.getNeighborsOfDesiredEdgeTypes(node, self.getAllNeighborEdgeTypes())
+
+    def getAllNeighborEdgeTypes(self):
+        # The edge types that getAllNeighbors follows
+        return EdgeType.getStandardEdgeTypes()
+
+    def getSnapshot(self):
+        # Returns a frozen GraphSnapshot of the graph. It is taken the first
+        # time it is asked for after the graph changes (normally after each
+        # updateGraphByOneNavigation), and shared by all the algorithms that
+        # run on it until the next change.
+        if self.__snapshot is None or self.__snapshot.version != self.version:
+            self.__snapshot = GraphSnapshot(self.graph, self.version)
+        return self.__snapshot
+
+    def getSnapshotNodeId(self, node):
+        # Returns the id in the snapshot of the graph node that node stands
+        # for (see getFqnOfEquivalentNode), or None if it is not in the graph
+        equivalentNode = node
+        if self.langHelper.isMethodFqn(node):
+            equivalentNode = self.getFqnOfEquivalentNode(node)
+        return self.getSnapshot().getId(equivalentNode)
 
     def getFqnOfEquivalentNode(self, methodFqn):
         return methodFqn
@@ -369,27 +407,41 @@ class PfisGraph(object):
     def containsNode(self, node):
         return node in self.graph.node
 
+    def isPredictableMethod(self, node):
+        # Returns whether node is a method that can be predicted
+        return node in self.predictableMethods
+
+    def getPredictableMethods(self, nodes, excludeNode=None):
+        # Returns the nodes that are methods that can be predicted, other than
+        # excludeNode, in the same order
+        predictableMethods = self.predictableMethods
+        return [node for node in nodes if node in predictableMethods and node != excludeNode]
+
     def getNode(self, nodeName):
         return self.graph.node[nodeName]
 
     def cloneNode(self, cloneTo, cloneFrom):
         #Create a node
         self.graph.add_node(cloneTo)
+        self.__edgesChanged([cloneTo])
 
         #Copy Node attributes
+        self.__setNodeType(cloneTo, self.getNode(cloneFrom)['type'])
         clonedNode = self.getNode(cloneTo)
-        clonedNode['type'] = self.getNode(cloneFrom)['type']
 
         #Copy edge relationships
         sourceNodeNeighbors = self.getAllNeighbors(cloneFrom)
         for neighborFqn in sourceNodeNeighbors:
             neighborNode = self.getNode(neighborFqn)
 
-            edgeTypes = self.graph.get_edge_data(cloneFrom, neighborFqn)['types']
+            edgeTypes = EdgeType.getTypes(self.graph.get_edge_data(cloneFrom, neighborFqn)['types'])
 
             for edgeType in edgeTypes:
                 self._addEdge(cloneTo, neighborFqn, clonedNode['type'], neighborNode['type'], edgeType)
 
 
     def removeNode(self, nodeFqn):
-        self.graph.remove_node(nodeFqn)
\ No newline at end of file
+        neighbors = self.graph.neighbors(nodeFqn)
+        self.graph.remove_node(nodeFqn)
+        self.predictableMethods.discard(nodeFqn)
+        self.__edgesChanged([nodeFqn] + neighbors)
\ No newline at end of file
@@ -45,6 +45,20 @@ class PfisGraphWithSimilarPatches(PfisGraphWithVariants):
 			return equivalentNode in self.graph.nodes()
 		return node in self.graph.nodes()
 
+	def isPredictableMethod(self, node):
+		if self.langHelper.isMethodFqn(node):
+			equivalentNode = self.getFqnOfEquivalentNode(node)
+			if equivalentNode != node:
+				# Predictable if the node it stands for is a method, unless
+				# the node itself is excluded
+				return equivalentNode in self.graph.node \
+					and self.graph.node[equivalentNode]['type'] == NodeType.METHOD \
+					and not self.langHelper.excludeMethod(node)
+		return node in self.predictableMethods
+
+	def getPredictableMethods(self, nodes, excludeNode=None):
+		return [node for node in nodes if node != excludeNode and self.isPredictableMethod(node)]
+
 	def getNode(self, nodeName):
 		equivalentNode = nodeName
 		if self.langHelper.isMethodFqn(nodeName):
@@ -19,9 +19,8 @@ class PfisGraphWithVariants(PfisGraph):
 				if self.langHelper.isVariantOf(node1, node2):
 					self._addEdge(node1, node2, node1Type, self.graph.node[node2]['type'], EdgeType.VARIANT_OF)
 
-	def getAllNeighbors(self, node):
-		edges = EdgeType.getAll()
-		return self.getNeighborsOfDesiredEdgeTypes(node, edges)
+	def getAllNeighborEdgeTypes(self):
+		return EdgeType.getAll()
 
 	def cloneNode(self, cloneTo, cloneFrom):
 		PfisGraph.cloneNode(self, cloneTo, cloneFrom)
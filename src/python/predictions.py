@@ -1,7 +1,9 @@
 import os
+from timestamps import Timestamps
 
 class Prediction:
-    def __init__(self, navNum, rank, length, numTies, fromLoc, toLoc, timestamp, topPredictions=[]):
+    def __init__(self, navNum, rank, length, numTies, fromLoc, toLoc, timestamp, topPredictions=[],
+                 iterations=None):
 
         self.navNum = str(navNum)
         self.rank = str(rank)
@@ -9,13 +11,19 @@ class Prediction:
         self.numTies = str(numTies)
         self.fromLoc = fromLoc
         self.toLoc = toLoc
-        self.timestamp = str(timestamp)
+        self.timestamp = Timestamps.toString(timestamp)
         self.topPredictions = topPredictions
+        # The number of spreading iterations the prediction used, for
+        # algorithms that can stop spreading early. None otherwise.
+        self.iterations = iterations
 
     def __str__(self):
-        return self.navNum + '\t' + self.timestamp + '\t' + self.rank + '\t' \
+        line = self.navNum + '\t' + self.timestamp + '\t' + self.rank + '\t' \
             + self.length + '\t' + self.numTies + '\t' \
             + self.fromLoc + '\t' + self.toLoc
+        if self.iterations is not None:
+            line += '\t' + str(self.iterations)
+        return line
 
     def getTopPredictionString(self, topPrediction):
         return self.navNum + "\t"+ self.timestamp + "\t" +\
@@ -37,9 +45,18 @@ class Predictions:
             self.topPredictionsFileName = os.path.join(topPredictionsFolder, fileName)
 
     def getPredictionsFileHeader(self):
-        return "Prediction"+ '\t' + "Timestamp" + '\t' + self.algName + " Rank" + "\t" \
+        header = "Prediction"+ '\t' + "Timestamp" + '\t' + self.algName + " Rank" + "\t" \
             + "Out of" + '\t' + "No. of Ties" + '\t' \
             + "From loc" + '\t' + "To loc"
+        if self.hasIterations():
+            header += '\t' + "Iterations"
+        return header
+
+    def hasIterations(self):
+        for entry in self.entries:
+            if entry.iterations is not None:
+                return True
+        return False
 
     def getTopNPredictionsFileHeader(self):
         return "NavNum" + "\t"+ "Timestamp" + "\t"\
@@ -1,12 +1,14 @@
 from predictions import Predictions
 from navpath import NavigationPath
+from algorithmPFIS import PFIS
+from algorithmPFIS import SharedSpread
 
 class Predictor(object):
 	def __init__(self, graph, navPath):
 		self.graph = graph
 		self.navPath = navPath
 		self.navNumber = -1
-		self.endTimeStamp = '0'
+		self.endTimeStamp = 0
 
 	def makeAllPredictions(self, algorithms, outputFolder, topPredictionsFolder=None):
 
@@ -21,9 +23,14 @@ class Predictor(object):
 			results[algorithm.name] = Predictions(algorithm.name, outputFolder, algorithm.fileName, algorithm.includeTop, topPredictionsFolder)
 
 		totalPredictions = self.navPath.getLength() - 1
+		sharedSpreads = self.__shareSpreads(algorithms)
+		leaders = [sharedSpread.leader for sharedSpread in sharedSpreads]
+		algorithms = leaders + [algorithm for algorithm in algorithms if algorithm not in leaders]
 
 		for _ in range(1, totalPredictions + 1):
 			self.updateGraphByOneNavigation()
+			for sharedSpread in sharedSpreads:
+				sharedSpread.clear()
 			print 'Making predictions for navigation #' + str(self.navNumber) + ' of ' + str(totalPredictions)
 			for algorithm in algorithms:
 				results[algorithm.name].addPrediction(self.__makePrediction(algorithm))
@@ -32,6 +39,24 @@ class Predictor(object):
 		print self.graph.printEntireGraphStats()
 		return results
 
+	def __shareSpreads(self, algorithms):
+		# PFIS instances that only differ in numSpread share one spread per
+		# navigation, see SharedSpread. The leaders must predict first.
+		groups = {}
+		for algorithm in algorithms:
+			if isinstance(algorithm, PFIS):
+				algorithm.sharedSpread = None
+				key = algorithm.getSharedSpreadKey()
+				if key is not None:
+					groups.setdefault(key, []).append(algorithm)
+
+		sharedSpreads = []
+		for key in groups:
+			if len(groups[key]) > 1:
+				sharedSpreads.append(SharedSpread(groups[key]))
+				print 'Sharing one spread between ' + ', '.join(algorithm.name for algorithm in groups[key])
+		return sharedSpreads
+
 	def __makePrediction(self, predictiveAlgorithm):
 		print '\tMaking predictions for ' + predictiveAlgorithm.name + '...'
 		return predictiveAlgorithm.makePrediction(self.graph, self.navPath, self.navNumber)
@@ -0,0 +1,114 @@
+import heapq
+
+class Ranking(object):
+    # The ranking of a prediction's candidates by their scores in
+    # mapCandidateToScore. Lower scores rank first, or higher ones with
+    # reverse=True (as in sorted). Candidates with the same score are ties
+    # of each other: they share the average of the positions they take,
+    # counting from 1, and are ordered as in candidates.
+    #
+    # Nothing is sorted unless getSortedCandidates is called. A rank counts
+    # the scores that beat or tie it, and the top predictions come from a
+    # heap bounded by how many are wanted.
+    #
+    # A ranking can also have a tail of numTail more candidates that aren't
+    # given a score. They all tie with each other and rank after every
+    # candidate in candidates, and getTail() lists them, in order, only if
+    # some of them are among the top predictions.
+
+    def __init__(self, candidates, mapCandidateToScore, reverse=False, numTail=0, getTail=None):
+        self.candidates = candidates
+        self.mapCandidateToScore = mapCandidateToScore
+        self.reverse = reverse
+        self.numTail = numTail
+        self.getTail = getTail
+
+        self.__candidateSet = None
+        self.__sortedCandidates = None
+
+    def getLength(self):
+        return len(self.candidates) + self.numTail
+
+    def contains(self, candidate):
+        # Only tells about the candidates with a score, not the tail
+        if self.__candidateSet is None:
+            self.__candidateSet = set(self.candidates)
+        return candidate in self.__candidateSet
+
+    def getRank(self, candidate):
+        # Returns the rank with ties and the number of ties of the candidate.
+        # The candidate itself is counted as one of its ties. Candidates
+        # without a score are in the tail.
+        if self.numTail > 0 and candidate not in self.mapCandidateToScore:
+            return self.__getRankOfTail()
+        return self.getRankOfScore(self.mapCandidateToScore[candidate])
+
+    def getRankOfScore(self, score):
+        # Returns the rank with ties and the number of ties a candidate with
+        # this score has
+        scores = [self.mapCandidateToScore[candidate] for candidate in self.candidates]
+        if self.reverse:
+            numBetter = sum(1 for other in scores if other > score)
+        else:
+            numBetter = sum(1 for other in scores if other < score)
+        return self.__getRankOfPositions(numBetter, numBetter + scores.count(score) - 1)
+
+    def getTopPredictions(self, numTopPredictions):
+        # Returns the (candidate, rank with ties) of the numTopPredictions best
+        # candidates, and of every candidate tied with the last of them
+        topPredictions = self.__getTopScoredPredictions(min(numTopPredictions, len(self.candidates)))
+        if numTopPredictions > len(self.candidates) and self.numTail > 0:
+            rank = self.__getRankOfTail()["rankWithTies"]
+            topPredictions.extend((candidate, rank) for candidate in self.getTail())
+        return topPredictions
+
+    def getSortedCandidates(self):
+        # Returns all the candidates in ranking order. This is the only full
+        # sort, done on first request.
+        if self.__sortedCandidates is None:
+            self.__sortedCandidates = sorted(self.candidates, key=self.__getKey)
+            if self.numTail > 0:
+                self.__sortedCandidates.extend(self.getTail())
+        return self.__sortedCandidates
+
+    def __getTopScoredPredictions(self, numTopPredictions):
+        if numTopPredictions <= 0:
+            return []
+
+        keys = [(self.__getKey(candidate), i) for i, candidate in enumerate(self.candidates)]
+        top = heapq.nsmallest(numTopPredictions, keys)
+
+        # The other ties of the last one come after it in candidates
+        lastKey, lastIndex = top[-1]
+        top.extend(key for key in keys[lastIndex + 1:] if key[0] == lastKey)
+
+        # Every candidate that ranks before the last one is in top, so the
+        # ranks can be counted within it
+        topPredictions = []
+        first = 0
+        while first < len(top):
+            last = first
+            while last + 1 < len(top) and top[last + 1][0] == top[first][0]:
+                last += 1
+            rank = self.__getRankOfPositions(first, last)["rankWithTies"]
+            for i in range(first, last + 1):
+                topPredictions.append((self.candidates[top[i][1]], rank))
+            first = last + 1
+        return topPredictions
+
+    def __getKey(self, candidate):
+        # Lower keys rank first
+        if self.reverse:
+            return -self.mapCandidateToScore[candidate]
+        return self.mapCandidateToScore[candidate]
+
+    def __getRankOfTail(self):
+        return self.__getRankOfPositions(len(self.candidates), len(self.candidates) + self.numTail - 1)
+
+    def __getRankOfPositions(self, first, last):
+        # The candidates from position first to last, counting from 0, are
+        # ties. Note that ranks count from 1.
+        numTies = last - first + 1
+        if numTies <= 0:
+            return {"rankWithTies": 0.0, "numTies": 0}
+        return {"rankWithTies": (first + last) / 2.0 + 1, "numTies": numTies}
@@ -0,0 +1,100 @@
+import numpy
+from scipy import sparse
+
+class TermDocumentMatrix(object):
+    # The word counts of a corpus as a sparse matrix with a row per document
+    # and a column per word id, along with the document frequency of every
+    # word. Rows are added and replaced one at a time as the corpus's
+    # documents are, so nothing is rebuilt between predictions.
+    #
+    # The rows are kept in compressed sparse row (CSR) form: the word ids of
+    # document i are indices[offsets[i]:offsets[i + 1]] and their counts are
+    # the same slice of counts. The arrays have room to grow and only
+    # their used part is handed to scipy.
+    #
+    # Anything computed from the matrix, such as inverse document
+    # frequencies, can be cached against version, which changes with every
+    # added or replaced row. The version each row was last set at is kept,
+    # see getRowsChangedSince.
+
+    def __init__(self):
+        self.version = 0
+        self.numDocuments = 0
+        self.numTerms = 0
+
+        self.offsets = numpy.zeros(64, dtype=numpy.int32)
+        self.rowVersions = numpy.zeros(64, dtype=numpy.int64)
+        self.indices = numpy.zeros(1024, dtype=numpy.int32)
+        self.counts = numpy.zeros(1024)
+        self.documentFrequencies = numpy.zeros(1024)
+
+        # See getMatrix
+        self.__matrix = None
+
+    def addRow(self, bow):
+        # Adds a document, given as the (word id, count) list that
+        # Dictionary.doc2bow returns
+        if self.numDocuments + 2 > len(self.offsets):
+            self.offsets = self.__grow(self.offsets, self.numDocuments + 2)
+            self.rowVersions = self.__grow(self.rowVersions, self.numDocuments + 2)
+
+        start = self.offsets[self.numDocuments]
+        self.__setRow(start, start, bow)
+        self.rowVersions[self.numDocuments] = self.version
+        self.numDocuments += 1
+        self.offsets[self.numDocuments] = start + len(bow)
+
+    def replaceRow(self, document, bow):
+        start, end = self.offsets[document], self.offsets[document + 1]
+        self.documentFrequencies[self.indices[start:end]] -= 1
+        self.__setRow(start, end, bow)
+        self.rowVersions[document] = self.version
+        self.offsets[document + 1:self.numDocuments + 1] += len(bow) - (end - start)
+
+    def getMatrix(self):
+        # Returns the counts as a scipy CSR matrix. It shares the arrays of
+        # this matrix, so it is only valid until the next change.
+        if self.__matrix is None or self.__matrix[0] != self.version:
+            numValues = self.offsets[self.numDocuments]
+            matrix = sparse.csr_matrix((self.counts[:numValues], self.indices[:numValues],
+                                        self.offsets[:self.numDocuments + 1]),
+                                       shape=(self.numDocuments, self.numTerms), copy=False)
+            self.__matrix = (self.version, matrix)
+        return self.__matrix[1]
+
+    def getRowsChangedSince(self, version):
+        # Returns the documents added or replaced after the matrix was at the
+        # given version
+        return numpy.flatnonzero(self.rowVersions[:self.numDocuments] > version)
+
+    def getDocumentFrequencies(self):
+        return self.documentFrequencies[:self.numTerms]
+
+    def __setRow(self, start, end, bow):
+        # Puts the row bow in place of the values from start to end, moving
+        # the values after end if it has a different length
+        numValues = self.offsets[self.numDocuments]
+        newEnd = start + len(bow)
+        if newEnd != end:
+            if numValues + newEnd - end > len(self.indices):
+                self.indices = self.__grow(self.indices, numValues + newEnd - end)
+                self.counts = self.__grow(self.counts, numValues + newEnd - end)
+            self.indices[newEnd:numValues + newEnd - end] = self.indices[end:numValues].copy()
+            self.counts[newEnd:numValues + newEnd - end] = self.counts[end:numValues].copy()
+
+        for i, (termId, count) in enumerate(bow):
+            self.indices[start + i] = termId
+            self.counts[start + i] = count
+
+        if len(bow) > 0:
+            self.numTerms = max(self.numTerms, bow[-1][0] + 1)
+            if self.numTerms > len(self.documentFrequencies):
+                self.documentFrequencies = self.__grow(self.documentFrequencies, self.numTerms)
+            self.documentFrequencies[self.indices[start:newEnd]] += 1
+
+        self.version += 1
+
+    def __grow(self, values, size):
+        grown = numpy.zeros(max(size, 2 * len(values)), dtype=values.dtype)
+        grown[:len(values)] = values
+        return grown
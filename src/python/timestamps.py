@@ -0,0 +1,27 @@
+import calendar
+import datetime
+import iso8601
+
+class Timestamps(object):
+    # PFIG logs timestamps as text. The working database normalizes them to
+    # integer milliseconds since the epoch (UTC), which is what navigations,
+    # the predictor and the event store carry. Text is only produced again for
+    # the results files.
+
+    EPOCH = datetime.datetime(1970, 1, 1, tzinfo=iso8601.UTC)
+
+    @staticmethod
+    def toMillis(timestamp):
+        if isinstance(timestamp, (int, long)):
+            return timestamp
+
+        if not isinstance(timestamp, datetime.datetime):
+            timestamp = iso8601.parse_date(timestamp)
+
+        return calendar.timegm(timestamp.utctimetuple()) * 1000 + timestamp.microsecond // 1000
+
+    @staticmethod
+    def toString(millis):
+        # The inverse of toMillis, formatted like str() of a parsed PFIG
+        # timestamp
+        return str(Timestamps.EPOCH + datetime.timedelta(milliseconds=millis))
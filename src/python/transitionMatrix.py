@@ -0,0 +1,53 @@
+import numpy
+from scipy import sparse
+
+class TransitionMatrix(object):
+    # The degree-normalized transition matrix of a GraphSnapshot, restricted
+    # to the edges whose type is in mask. Column i holds 1 / degree(i) in the
+    # rows of the neighbors of node i, so multiplying it by a vector of
+    # activations gives every node the activation its neighbors spread to it
+    # in one step (before the decay factor).
+    #
+    # The filtered neighbors are also kept in CSR form as NumPy arrays, in
+    # the adjacency order of the snapshot, for spreading node by node.
+
+    def __init__(self, snapshot, mask):
+        numNodes = snapshot.getNumberOfNodes()
+        offsets = numpy.array(snapshot.offsets, dtype=numpy.int64)
+        indices = numpy.array(snapshot.indices, dtype=numpy.int64)
+        edgeTypes = numpy.array(snapshot.edgeTypes, dtype=numpy.int64)
+
+        sources = numpy.repeat(numpy.arange(numNodes), numpy.diff(offsets))
+        keep = (edgeTypes & mask) != 0
+        sources = sources[keep]
+
+        # The neighbors of node i are neighbors[offsets[i]:offsets[i + 1]]
+        self.neighbors = indices[keep]
+        self.degrees = numpy.bincount(sources, minlength=numNodes)
+        self.offsets = numpy.zeros(numNodes + 1, dtype=numpy.int64)
+        numpy.cumsum(self.degrees, out=self.offsets[1:])
+
+        # 1 / degree, as in 1.0 / len(neighbors). Nodes without neighbors
+        # get 0, they spread nothing.
+        self.edgeWeights = numpy.zeros(numNodes)
+        hasNeighbors = self.degrees > 0
+        self.edgeWeights[hasNeighbors] = 1.0 / self.degrees[hasNeighbors]
+
+        # Nodes joined to themselves gain activation while spreading it
+        self.hasSelfLoop = numpy.zeros(numNodes, dtype=bool)
+        self.hasSelfLoop[sources[sources == self.neighbors]] = True
+
+        self.matrix = sparse.csr_matrix((self.edgeWeights[sources], (self.neighbors, sources)),
+                                        shape=(numNodes, numNodes))
+
+    def getNumberOfNodes(self):
+        return len(self.degrees)
+
+    def getNeighbors(self, nodeId):
+        # Returns the neighbor ids of the node as a NumPy array view
+        return self.neighbors[self.offsets[nodeId]:self.offsets[nodeId + 1]]
+
+    def spread(self, activation):
+        # Returns the activation every node receives from its neighbors in
+        # one step
+        return self.matrix.dot(activation)
@@ -2,16 +2,25 @@ from navpath import NavigationPath
 
 class VariantAwareNavigationPath(NavigationPath):
 
-	def __init__(self, dbFilePath, langHelper, projectFolderPath, collapse = False, verbose = False):
-		NavigationPath.__init__(self, dbFilePath, langHelper, projectFolderPath, verbose)
+	def __init__(self, defaultPath, collapse = False, cache = None, verbose = False):
+		# A variant-aware path rewrites the navigations of the default path, so
+		# it is derived from an already built one instead of the database
+		NavigationPath.__init__(self, defaultPath.dbFilePath, defaultPath.langHelper, defaultPath.projectFolderPath, verbose, defaultPath=defaultPath)
 		self.collapse = collapse
 		if self.collapse:
 			self._name = NavigationPath.VARIANT_AWARE_COLLAPSED
 		else:
 			self._name = NavigationPath.VARIANT_AWARE
 
-		self.__variantAwareNavigations = []
-		self.__replaceNavsToUnknownToLastSeenVariant()
+		self.__variantAwareNavigations = None
+		if cache is not None:
+			self.__variantAwareNavigations = cache.get(self._name)
+
+		if self.__variantAwareNavigations is None:
+			self.__variantAwareNavigations = []
+			self.__replaceNavsToUnknownToLastSeenVariant()
+			if cache is not None:
+				cache.put(self._name, self.__variantAwareNavigations)
 		self._printVariantAwareNavigations()
 
 	# This method changes the way unknowns are handled for variant-aware algorithms
@@ -1,21 +1,15 @@
-import sqlite3
 import re
-import os
 from defaultPatchStrategy import DefaultPatchStrategy
+from variantsCatalog import VariantsCatalog
 from patches import *
 
-GET_VARIANT_POSITION_QUERY = 'select * from VARIANTS where NAME= ?'
-FETCH_PATCH_FOR_FQN_QUERY = 'select vf.method, v1.name, v2.name, vf.body, vf.uuid from variants_to_functions as vf ' \
-                            'join variants as v1 on vf.start = v1.num ' \
-                            'join variants as v2 on vf.end=v2.num ' \
-                            'where vf.method = ? and start <= ? and end >=?'
-
 class VariantPatchStrategy(DefaultPatchStrategy):
 	FILE_TARGET_REGEX = re.compile(r'L/hexcom/(.*?)/(.*)')
 
 	def __init__(self, langHelper, variantsDb):
 		DefaultPatchStrategy.__init__(self, langHelper)
 		self.variantsDb = variantsDb
+		self.variantsCatalog = VariantsCatalog.forDatabase(variantsDb)
 		self.idToPatchMap = {}
 		self.fqnToIdMap = {}
 
@@ -31,11 +25,12 @@ class VariantPatchStrategy(DefaultPatchStrategy):
 			methodPatch = self.__getNewlyVisitedMethodPatch(methodFqn)
 
 			#If ID not exists earlier, ID -> Patch map
-			if methodPatch.uuid not in self.idToPatchMap.keys():
+			if methodPatch.uuid not in self.idToPatchMap:
 				self.idToPatchMap[methodPatch.uuid] = methodPatch
 
-			#Add entry for FQN -> UUID
+			#Add entry for FQN -> UUID, and FQN -> the patch of that UUID
 			self.fqnToIdMap[methodFqn] = methodPatch.uuid
+			self.patchesByFqn[methodFqn] = self.idToPatchMap[methodPatch.uuid]
 
 			#Add to known patches for file
 			if methodPatch not in files[normalizedClass]:
@@ -50,15 +45,8 @@ class VariantPatchStrategy(DefaultPatchStrategy):
 		else:
 			return self.__fetchMethodPatchFromDb(methodFqn)
 
-	def getMethodPatchByFqn(self, fqn, files):
-		if fqn in self.fqnToIdMap.keys():
-			uuid = self.fqnToIdMap[fqn]
-			return self.idToPatchMap[uuid]
-		return None
-
 	def _getMethodPatchByFqn_(self, fqn, files):
-		patchRow = self.__getPatchRow(fqn)
-		uuid = patchRow[4]
+		uuid = self.__getPatchUuid(fqn)
 		if uuid in self.idToPatchMap:
 			return self.idToPatchMap[uuid]
 		else:
@@ -73,32 +61,16 @@ class VariantPatchStrategy(DefaultPatchStrategy):
 			return VariantPatchStrategy.FILE_TARGET_REGEX.match(fqn).groups()[0]
 
 	def __fetchMethodPatchFromDb(self, fqn):
-		patchRow = self.__getPatchRow(fqn)
+		uuid = self.__getPatchUuid(fqn)
+		if uuid is None:
+			raise Exception("No function patch in variants db for: ", fqn)
 		methodPatch = MethodPatch(fqn)
-		methodPatch.uuid = patchRow[4]
+		methodPatch.uuid = uuid
 		return methodPatch
 
-	def __getPatchRow(self, fqn):
-
+	def __getPatchUuid(self, fqn):
 		pathRelativeToVariant = self.__getPathRelativeToVariantFolder(fqn)
 		variantName = self.__getVariantName(fqn)
 
-		if not os.path.exists(self.variantsDb):
-			raise Exception("Db not found: ", self.variantsDb)
-
-		conn = sqlite3.connect(self.variantsDb)
-
-		if conn is None:
-			raise Exception("Connection Error: ", self.variantsDb)
-
-		c = conn.cursor()
-
-		c.execute(GET_VARIANT_POSITION_QUERY, [variantName])
-		variantNum = c.fetchone()[0]
-
-		c.execute(FETCH_PATCH_FOR_FQN_QUERY, [pathRelativeToVariant, variantNum, variantNum])
-		patchRow = c.fetchone()
-
-		conn.close()
-
-		return patchRow
+		variantNum = self.variantsCatalog.getVariantNumber(variantName)
+		return self.variantsCatalog.getFunctionUuid(pathRelativeToVariant, variantNum)
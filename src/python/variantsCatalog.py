@@ -0,0 +1,78 @@
+import bisect
+import os
+import sqlite3
+
+class VariantsCatalog(object):
+    # An in-memory copy of a variants database. The variant numbers and the
+    # variant ranges of every function are read once, so that finding the
+    # function patch of a method in a given variant does not touch the disk.
+    # Every strategy that uses the same variants database shares one catalog.
+
+    VARIANTS_QUERY = "SELECT * FROM VARIANTS"
+    FUNCTIONS_QUERY = "SELECT vf.method, vf.start, vf.end, vf.rowid, vf.uuid FROM variants_to_functions AS vf " \
+                      "JOIN variants AS v1 ON vf.start = v1.num " \
+                      "JOIN variants AS v2 ON vf.end = v2.num " \
+                      "ORDER BY vf.method, vf.start"
+
+    __catalogs = {}
+
+    @staticmethod
+    def forDatabase(variantsDb):
+        if variantsDb not in VariantsCatalog.__catalogs:
+            VariantsCatalog.__catalogs[variantsDb] = VariantsCatalog(variantsDb)
+        return VariantsCatalog.__catalogs[variantsDb]
+
+    def __init__(self, variantsDb):
+        if not os.path.exists(variantsDb):
+            raise Exception("Db not found: ", variantsDb)
+
+        self.variantsDb = variantsDb
+        # Variant name -> variant number
+        self.variantNumbers = {}
+        # Method path -> the (start, end, rowid, uuid) variant ranges of its
+        # function patches sorted by start, with the starts in a separate list
+        # for bisecting
+        self.functionRanges = {}
+        self.functionStarts = {}
+
+        print "Loading variants from " + variantsDb + "..."
+        conn = sqlite3.connect(variantsDb)
+        conn.row_factory = sqlite3.Row
+
+        for row in conn.execute(VariantsCatalog.VARIANTS_QUERY):
+            # Keep the first row for a name, like fetchone() on a query by name
+            if row['name'] not in self.variantNumbers:
+                self.variantNumbers[row['name']] = row[0]
+
+        for method, start, end, rowid, uuid in conn.execute(VariantsCatalog.FUNCTIONS_QUERY):
+            if method not in self.functionRanges:
+                self.functionRanges[method] = []
+                self.functionStarts[method] = []
+            self.functionRanges[method].append((start, end, rowid, uuid))
+            self.functionStarts[method].append(start)
+
+        conn.close()
+        print "Done."
+
+    def getVariantNumber(self, variantName):
+        if variantName not in self.variantNumbers:
+            raise Exception("Variant not found: ", variantName)
+        return self.variantNumbers[variantName]
+
+    def getFunctionUuid(self, methodPath, variantNumber):
+        # Returns the uuid of the function patch of methodPath whose variant
+        # range includes variantNumber, or None if there is none. If ranges
+        # overlap, the first one in the database (by rowid) wins, like
+        # fetchone() on a query by method and variant.
+        if methodPath not in self.functionRanges:
+            return None
+
+        ranges = self.functionRanges[methodPath]
+        i = bisect.bisect_right(self.functionStarts[methodPath], variantNumber)
+        found = None
+        for start, end, rowid, uuid in ranges[:i]:
+            if end >= variantNumber and (found is None or rowid < found[0]):
+                found = (rowid, uuid)
+        if found is None:
+            return None
+        return found[1]
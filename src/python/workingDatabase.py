@@ -0,0 +1,85 @@
+import sqlite3
+from timestamps import Timestamps
+
+class WorkingDatabase(object):
+    # The working database is a scratch copy of the PFIG database that is only
+    # read by the models (apart from the PFIG headers inserted while building
+    # the navigation path). This class prepares that copy for reading and hands
+    # out connections that are tuned for it.
+
+    # PFIG logs timestamps as text. They are normalized once into an integer
+    # column of milliseconds since the epoch, which is what the rest of the
+    # models compare and slice by.
+    TIMESTAMP_COLUMN = "timestamp_ms"
+
+    # Every query on logger_log filters by action and a timestamp range, and
+    # only reads the timestamp, target and referrer of the rows. An index on
+    # all four columns lets SQLite answer each of them with a range seek on
+    # the index alone instead of a scan of the table.
+    INDEXES = [
+        "CREATE INDEX IF NOT EXISTS logger_log_action_timestamp_ms "
+        "ON logger_log (action, timestamp_ms, target, referrer)"
+    ]
+
+    # Read-oriented settings. These are per connection in SQLite, so they are
+    # applied in connect() rather than once on the file. Journaling is off
+    # because the working copy can always be recreated from the original.
+    PRAGMAS = [
+        "PRAGMA mmap_size = 1073741824",
+        "PRAGMA cache_size = -262144",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA journal_mode = OFF",
+        "PRAGMA synchronous = OFF"
+    ]
+
+    @staticmethod
+    def connect(dbFilePath):
+        conn = sqlite3.connect(dbFilePath)
+        for pragma in WorkingDatabase.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @staticmethod
+    def prepare(dbFilePath):
+        print "Indexing the working copy of the database..."
+        conn = WorkingDatabase.connect(dbFilePath)
+        WorkingDatabase.__addTimestampColumn(conn)
+        for index in WorkingDatabase.INDEXES:
+            conn.execute(index)
+        conn.execute("ANALYZE logger_log")
+        conn.commit()
+        conn.close()
+        print "Done."
+
+    @staticmethod
+    def __addTimestampColumn(conn):
+        # Fills the integer timestamp column for every row that does not have
+        # it yet. Many rows share a timestamp, so each text timestamp is only
+        # parsed once.
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(logger_log)")]
+        if WorkingDatabase.TIMESTAMP_COLUMN not in columns:
+            conn.execute("ALTER TABLE logger_log ADD COLUMN " + WorkingDatabase.TIMESTAMP_COLUMN + " INTEGER")
+
+        parsedTimestamps = {}
+        def toMillis(timestamp):
+            if timestamp not in parsedTimestamps:
+                parsedTimestamps[timestamp] = Timestamps.toMillis(timestamp)
+            return parsedTimestamps[timestamp]
+
+        conn.create_function("pfig_millis", 1, toMillis)
+        conn.execute("UPDATE logger_log SET " + WorkingDatabase.TIMESTAMP_COLUMN + " = pfig_millis(timestamp) "
+                     "WHERE " + WorkingDatabase.TIMESTAMP_COLUMN + " IS NULL")
+
+    @staticmethod
+    def printQueryPlans(dbFilePath, namedQueries):
+        # Prints how SQLite will run each of the given queries, so that it is
+        # easy to see which ones use the index and which ones scan the table.
+        # namedQueries is a list of (name, query) tuples.
+        conn = WorkingDatabase.connect(dbFilePath)
+        print "Query plans:"
+        for name, query in namedQueries:
+            params = [0] * query.count('?')
+            print '\t' + name + ':'
+            for row in conn.execute("EXPLAIN QUERY PLAN " + query, params):
+                print '\t\t' + row[-1]
+        conn.close()
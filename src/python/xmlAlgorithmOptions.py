@@ -56,6 +56,9 @@ class XMLOptionsParser(object):
         for child in algorithmsNode:
             if child.tag == 'algorithm':
                 algorithm = self.algorithmFactory.getAlgorithm(child, suffix)
-                if algorithm != None:
+                # A sweep is a list of algorithms, see PFISSweep
+                if isinstance(algorithm, list):
+                    algorithms.extend(algorithm)
+                elif algorithm != None:
                     algorithms.append(algorithm)
         return algorithms
\ No newline at end of file